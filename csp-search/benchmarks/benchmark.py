@@ -0,0 +1,224 @@
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Directories of the solvers and their example instances, relative to this file
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCH_DIRECTORY = os.path.join(ROOT, "parte-2")
+CSP_DIRECTORY = os.path.join(ROOT, "parte-1")
+
+# Lines of the output of the solvers with counters, such as "# Expansions: 120" of Cosmos.py, "# nodes: 66" and
+# "# revisions: 157" of the native solver of CSPScheduling.py, "# constraint checks: 480" of python-constraint,
+# or "There were found 4"
+COUNTER_PATTERN = re.compile(r"^# ([\w ]+): (\d+)\s*$", re.MULTILINE)
+SOLUTIONS_PATTERN = re.compile(r"^There were found (\d+)", re.MULTILINE)
+
+
+class Case:
+    """
+    One benchmark: a name that identifies it in the baselines and the command line that runs the solver
+    """
+    def __init__(self, name, command):
+        self.name = name
+        self.command = command
+
+
+def search_cases(instances, heuristics):
+    """
+    Cases of Cosmos.py for every .prob instance and heuristic. The solvers run in a temporary directory, so the
+    paths of the instances are made absolute. The tables of the pattern database of h3 are cached in a relative
+    directory, inside the temporary directory of every run, so tables of earlier runs do not shorten its time.
+    """
+    script = os.path.join(SEARCH_DIRECTORY, "Cosmos.py")
+    return [Case("search/{}/{}".format(os.path.basename(path), heuristic),
+                 [sys.executable, script, os.path.abspath(path), heuristic, "--pdb-cache", "pdb-cache"])
+            for path in instances for heuristic in heuristics]
+
+
+def csp_cases(instances):
+    """
+    Cases of CSPScheduling.py for every .json instance, recording the number of solutions and the nodes and
+    revisions of the native solver
+    """
+    script = os.path.join(CSP_DIRECTORY, "CSPScheduling.py")
+    return [Case("csp/{}".format(os.path.basename(path)), [sys.executable, script, os.path.abspath(path)])
+            for path in instances]
+
+
+def run_once(case, timeout):
+    """
+    Runs a case once in a temporary directory, so the files written by the solver do not overwrite anything.
+
+    *Returns:
+    - dictionary with the wall time, the peak resident memory of the solver process in megabytes, the counters
+      printed by the solver and the status ("ok", "error" or "timeout")
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        stdout_path = os.path.join(directory, "stdout")
+        stderr_path = os.path.join(directory, "stderr")
+        with open(stdout_path, "w") as stdout, open(stderr_path, "w") as stderr:
+            start = time.perf_counter()
+            process = subprocess.Popen(case.command, cwd=directory, stdout=stdout, stderr=stderr)
+            # The process is waited with wait4 to get the resource usage of this child alone
+            while True:
+                pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+                if pid != 0:
+                    break
+                if time.perf_counter() - start > timeout:
+                    process.kill()
+                    os.wait4(process.pid, 0)
+                    process.returncode = -1
+                    return {"status": "timeout", "time": timeout, "peak_memory": None, "counters": {}}
+                time.sleep(0.005)
+            elapsed = time.perf_counter() - start
+            process.returncode = os.waitstatus_to_exitcode(status)
+        with open(stdout_path) as file:
+            output = file.read()
+        with open(stderr_path) as file:
+            error = file.read()
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = usage.ru_maxrss / (1024 * 1024) if sys.platform == "darwin" else usage.ru_maxrss / 1024
+
+    counters = {name.strip().lower().replace(" ", "_"): int(value) for name, value in COUNTER_PATTERN.findall(output)}
+    solutions = SOLUTIONS_PATTERN.search(output)
+    if solutions:
+        counters["solutions"] = int(solutions.group(1))
+    if process.returncode != 0:
+        return {"status": "error", "time": elapsed, "peak_memory": peak, "counters": counters,
+                "error": error.strip().splitlines()[-1] if error.strip() else "exit code {}".format(process.returncode)}
+    return {"status": "ok", "time": elapsed, "peak_memory": peak, "counters": counters}
+
+
+def run_case(case, repeat, timeout):
+    """
+    Runs a case repeat times and summarises the runs with the median time, the highest peak memory and the
+    counters of the last run
+    """
+    runs = []
+    for _ in range(repeat):
+        run = run_once(case, timeout)
+        runs.append(run)
+        if run["status"] != "ok":
+            break
+    ok = [run for run in runs if run["status"] == "ok"]
+    summary = {"name": case.name, "status": runs[-1]["status"], "runs": runs}
+    if ok:
+        summary["time"] = statistics.median(run["time"] for run in ok)
+        memories = [run["peak_memory"] for run in ok if run["peak_memory"] is not None]
+        summary["peak_memory"] = max(memories) if memories else None
+        summary["counters"] = ok[-1]["counters"]
+    return summary
+
+
+def compare(results, baseline, threshold, slack=0.05):
+    """
+    Compares the results with a baseline.
+
+    Regressions are the cases that were ok in the baseline and now fail or are missing, whose median time or peak
+    memory grew more than threshold (a fraction), whose counters grew or whose number of solutions changed. Times
+    only count as regressions when they also grew more than slack seconds, so the noise of the start of the
+    interpreter in the smallest instances is not flagged. Counters that went down are only reported as changes.
+
+    *Returns:
+    - list of regressions
+    - list of changes that are not regressions
+    """
+    regressions = []
+    changes = []
+    current = {result["name"]: result for result in results}
+    for old in baseline:
+        if old["status"] == "ok" and old["name"] not in current:
+            regressions.append("{}: missing (was ok)".format(old["name"]))
+    previous = {result["name"]: result for result in baseline}
+    for result in results:
+        old = previous.get(result["name"])
+        if old is None or old["status"] != "ok":
+            continue
+        if result["status"] != "ok":
+            regressions.append("{}: {} (was ok)".format(result["name"], result["status"]))
+            continue
+        if result["time"] > old["time"] * (1 + threshold) and result["time"] - old["time"] > slack:
+            regressions.append("{}: time {:.3f}s, baseline {:.3f}s".format(result["name"], result["time"], old["time"]))
+        if result.get("peak_memory") and old.get("peak_memory") and result["peak_memory"] > old["peak_memory"] * (1 + threshold):
+            regressions.append("{}: peak memory {:.1f}MB, baseline {:.1f}MB".format(result["name"], result["peak_memory"], old["peak_memory"]))
+        for counter, value in result["counters"].items():
+            if counter not in old["counters"] or value == old["counters"][counter]:
+                continue
+            message = "{}: {} {}, baseline {}".format(result["name"], counter, value, old["counters"][counter])
+            # The number of solutions is the answer of the solver, not its work, so any change is wrong
+            if counter == "solutions" or value > old["counters"][counter]:
+                regressions.append(message)
+            else:
+                changes.append(message)
+    return regressions, changes
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''Benchmarks Cosmos.py (A* with every heuristic) on the .prob instances and CSPScheduling.py on the
+        .json instances. Every case is run several times and its median wall time, peak memory and counters (expansions,
+        solutions, nodes, revisions...) are stored. Results can be saved as a baseline and compared against it to flag regressions.''',
+        epilog="""An example "python benchmark.py --save-baseline" and later "python benchmark.py --baseline baseline.json" """
+    )
+    parser.add_argument('--search-instances', nargs='*', default=[os.path.join(SEARCH_DIRECTORY, "ejemplos", "*.prob")],
+                        help='Glob patterns of the .prob instances (default the examples of parte-2)')
+    parser.add_argument('--csp-instances', nargs='*', default=[os.path.join(CSP_DIRECTORY, "tests", "*.json")],
+                        help='Glob patterns of the .json instances (default the tests of parte-1)')
+    parser.add_argument('--heuristics', nargs='+', default=['h1', 'h2', 'h3'], help='Heuristics of the search cases')
+    parser.add_argument('--filter', default=None, help='Only run the cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of every case')
+    parser.add_argument('--timeout', type=float, default=300, help='Seconds after which a run is stopped')
+    parser.add_argument('--output', default='results.json', help='File where the results are written')
+    parser.add_argument('--baseline', default=None, help='Baseline results to compare with')
+    parser.add_argument('--save-baseline', default=None, nargs='?', const='baseline.json', help='Also write the results as a baseline (default baseline.json)')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Relative growth of time or memory flagged as a regression')
+    parser.add_argument('--slack', type=float, default=0.05, help='Seconds of growth of the time below which it is not flagged')
+    args = parser.parse_args()
+
+    search_instances = sorted(path for pattern in args.search_instances for path in glob.glob(pattern))
+    csp_instances = sorted(path for pattern in args.csp_instances for path in glob.glob(pattern))
+    cases = search_cases(search_instances, args.heuristics) + csp_cases(csp_instances)
+    if args.filter is not None:
+        cases = [case for case in cases if args.filter in case.name]
+
+    results = []
+    for case in cases:
+        result = run_case(case, args.repeat, args.timeout)
+        results.append(result)
+        if result["status"] == "ok":
+            counters = ", ".join("{} {}".format(name, value) for name, value in result["counters"].items())
+            print("{}: {:.3f}s, {}".format(case.name, result["time"], counters))
+        else:
+            print("{}: {} {}".format(case.name, result["status"], result["runs"][-1].get("error", "")))
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=4)
+    if args.save_baseline is not None:
+        with open(args.save_baseline, 'w') as file:
+            json.dump(results, file, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        # The cases left out by the filter are not missing
+        if args.filter is not None:
+            baseline = [result for result in baseline if args.filter in result["name"]]
+        regressions, changes = compare(results, baseline, args.threshold, args.slack)
+        if changes:
+            print("\nChanges against {}:".format(args.baseline))
+            for change in changes:
+                print(change)
+        if regressions:
+            print("\nRegressions against {}:".format(args.baseline))
+            for regression in regressions:
+                print(regression)
+            sys.exit(1)
+        print("\nNo regressions against {}".format(args.baseline))
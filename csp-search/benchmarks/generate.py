@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import random
+
+
+def satellite_problem(satellites, objects, hours, rng):
+    """
+    Returns the text of a random satellite problem in the format read by Cosmos.py.
+
+    Satellites start covering consecutive pairs of bands (0-1, 2-3, ...) and the last one is placed one band after
+    the previous one, as Cosmos.py does, so the objects are placed in the bands 0 to 2*satellites-2. Object hours
+    are taken from 0 to hours-1 (at most 12). The costs of the satellites are 1 or 2 and their maximum battery
+    is at least their highest cost, so every operation can be done after recharging.
+    """
+    last_band = max(2 * satellites - 2, 1)
+    observations = ["({},{})".format(rng.randint(0, last_band), rng.randrange(min(hours, 12))) for _ in range(objects)]
+    lines = ["OBS: " + ";".join(observations)]
+    for index in range(satellites):
+        # Measurement, downlink, turn, recharge and maximum battery
+        costs = [rng.randint(1, 2) for _ in range(3)]
+        recharge = rng.randint(1, 2)
+        max_battery = rng.randint(max(costs), 8)
+        lines.append("SAT{}: {};{};{};{};{}".format(index + 1, costs[0], costs[1], costs[2], recharge, max_battery))
+    return "\n".join(lines) + "\n"
+
+
+def scheduling_problem(satellites, slots, antennas, domain_size, rng):
+    """
+    Returns a random antenna scheduling problem in the JSON format read by CSPScheduling.py.
+
+    Every satellite gets up to slots different time slots of the day and every slot a domain of domain_size
+    antennas taken from ANT1 to ANT<antennas>. The constraints pick random satellites and antennas in the same
+    proportions as the examples in parte-1/tests.
+    """
+    names = ["SAT{}".format(index + 1) for index in range(satellites)]
+    antenna_names = ["ANT{}".format(index + 1) for index in range(antennas)]
+    data = {}
+    for name in names:
+        data[name] = {}
+        for _ in range(slots):
+            start = rng.randrange(24)
+            end = (start + rng.randint(1, 6)) % 24
+            data[name]["{}-{}".format(start, end)] = rng.sample(antenna_names, min(domain_size, antennas))
+    group = max(2, satellites // 5)
+    constraints = {
+        "constraint_2": rng.sample(names, min(2, satellites)),
+        "constraint_3": rng.sample(names, min(group, satellites)),
+        "constraint_4": [[name, rng.choice(antenna_names)] for name in rng.sample(names, min(group, satellites))],
+        "constraint_5": rng.sample(antenna_names, min(2, antennas)),
+    }
+    return {"data": data, "constraints": constraints}
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''Generates synthetic instances to study how the solvers scale: satellite problems (.prob) for
+        Cosmos.py and antenna scheduling problems (.json) for CSPScheduling.py''',
+        epilog="""An example "python generate.py search generated --satellites 2 4 8 --objects 4 8 --count 3" """
+    )
+    parser.add_argument('kind', choices=['search', 'csp'], help='Kind of instance to generate')
+    parser.add_argument('output', help='Directory where the instances are written')
+    parser.add_argument('--satellites', type=int, nargs='+', default=[2, 4, 6], help='Numbers of satellites')
+    parser.add_argument('--objects', type=int, nargs='+', default=[4, 8], help='Numbers of objects (search)')
+    parser.add_argument('--hours', type=int, nargs='+', default=[12], help='Numbers of distinct hours of the objects, at most 12 (search)')
+    parser.add_argument('--slots', type=int, nargs='+', default=[1, 2], help='Numbers of slots per satellite (csp)')
+    parser.add_argument('--antennas', type=int, nargs='+', default=[12], help='Numbers of antennas (csp)')
+    parser.add_argument('--domain-size', type=int, default=3, help='Antennas in the domain of every slot (csp)')
+    parser.add_argument('--count', type=int, default=1, help='Instances generated for every combination of sizes')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    os.makedirs(args.output, exist_ok=True)
+    generated = 0
+    for satellites in args.satellites:
+        if args.kind == 'search':
+            for objects in args.objects:
+                for hours in args.hours:
+                    for number in range(args.count):
+                        path = os.path.join(args.output, "sat{}-obj{}-h{}-{}.prob".format(satellites, objects, hours, number))
+                        with open(path, 'w') as file:
+                            file.write(satellite_problem(satellites, objects, hours, rng))
+                        generated += 1
+        else:
+            for slots in args.slots:
+                for antennas in args.antennas:
+                    for number in range(args.count):
+                        path = os.path.join(args.output, "sat{}-slot{}-ant{}-{}.json".format(satellites, slots, antennas, number))
+                        with open(path, 'w') as file:
+                            json.dump(scheduling_problem(satellites, slots, antennas, args.domain_size, rng), file, indent=4)
+                        generated += 1
+    print("{} instances written to {}".format(generated, args.output))
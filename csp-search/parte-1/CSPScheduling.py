@@ -1,6 +1,11 @@
-import constraint
-import sys
+import argparse
 import json
+import sys
+
+from compiled import cached_model, default_cache_directory
+from components import Decomposition
+from engine import build_model, separate_frames
+from optimize import OBJECTIVES, optimize
 
 def same_antenna(*x):
     """
@@ -18,51 +23,40 @@ def diff_antenna(sat1,sat2):
     return sat1 != sat2
 
 
-def separate_frames(data):
+class CheckCounter:
     """
-    Receives the data dictionary extracted from the input JSON
-    Separates all the variables into two sets:
-    - before noon
-    - after noon 
+    Counts the constraint checks of python-constraint, which does not keep statistics of its search.
+    The functions of the constraints are wrapped to add one to checks every time they are called.
     """
-    before_noon = []
-    after_noon = []
-    # data items is a dictionary in which the keys are the satellites and the elements are keys
-    for satellite, slots in data.items():
-        for slot in slots.keys():
-            # Getting the starting time of the slot (they are represented as <start>-<end>)
-            start_time = int(slot.split("-")[0])
-            #  Dividing variables before and after noon
-            if start_time < 12:
-                before_noon.append(satellite + " " + slot)
-            else:
-                after_noon.append(satellite + " " + slot)
-    return before_noon, after_noon
+    def __init__(self):
+        self.checks = 0
 
-if __name__ == '__main__':
+    def wrap(self, function):
+        def counted(*values):
+            self.checks += 1
+            return function(*values)
+        return counted
 
-    file = sys.argv[1]
-
-    # Reading the input file that contains the data in json format
-    with open(file) as json_file:
-        file = json.load(json_file)
-        """
-        The JSON file has two main parts:
-        data: which specifies the combination of satellites and slots and their domain
-        constraints: which specifies the values for each constraint 
-        """
-        data = file["data"]
-        constraints = file["constraints"]
-        constraint_2 = constraints["constraint_2"]
-        constraint_3 = constraints["constraint_3"]
-        constraint_4 = constraints["constraint_4"]
-        constraint_5 = constraints["constraint_5"]
-        
 
+def build_problem(data, constraints, counter=None):
+    """
+    Builds the python-constraint problem of the "data" and "constraints" parts of an input JSON.
+    python-constraint is only imported here, so the native solver of engine.py works without it.
+    If counter is a CheckCounter, the checks of the constraints are counted in it.
+    """
+    constraint_2 = constraints["constraint_2"]
+    constraint_3 = constraints["constraint_3"]
+    constraint_4 = constraints["constraint_4"]
+    constraint_5 = constraints["constraint_5"]
+
+    import constraint
 
     # Instantiating a CSP problem
     problem = constraint.Problem()
 
+    def add_constraint(function, variables):
+        problem.addConstraint(function if counter is None else counter.wrap(function), variables)
+
     # Getting the variables from the input JSON and introducing them into the problem.
     # The variables are of the form SAT12 - 16-18:
     # The domains are lists of antennas.
@@ -78,7 +72,7 @@ if __name__ == '__main__':
         # We need to get every slot of each satellite
         for slot in data[satellite].keys():
             same_anetennas.append(satellite + " " + slot)
-    problem.addConstraint(same_antenna,same_anetennas)
+    add_constraint(same_antenna,same_anetennas)
         
     
     # Third constraint to have satellites use different antennas
@@ -101,7 +95,7 @@ if __name__ == '__main__':
             for satellite_j in range(satellite_i + 1,len(different)):
                 #Iterating over the next satellite's timeslot
                 for time_slot_j in range(len(different[satellite_j])):
-                    problem.addConstraint(diff_antenna, (different[satellite_i][time_slot_i], different[satellite_j][time_slot_j]))
+                    add_constraint(diff_antenna, (different[satellite_i][time_slot_i], different[satellite_j][time_slot_j]))
     
     
     #Fourth constraint to avoid wrong satellite configurations
@@ -129,7 +123,8 @@ if __name__ == '__main__':
                     # We get the forbidden atennas for each variable
                     antenna1 = constraint_4[satellite_i][1]
                     antenna2 = constraint_4[satellite_j][1]                    
-                    problem.addConstraint(lambda sat1,sat2:
+                    # The antennas are bound as default arguments, otherwise every lambda would use the last pair
+                    add_constraint(lambda sat1,sat2,antenna1=antenna1,antenna2=antenna2:
                                             not(sat1==antenna1 and sat2==antenna2), 
                                             (wrong_config[satellite_i][time_slot_i],wrong_config[satellite_j][time_slot_j]))
     
@@ -144,19 +139,110 @@ if __name__ == '__main__':
 
             for antenna_i in range(len(constraint_5)-1):
                 for antenna_j in range(antenna_i + 1, len(constraint_5)):
-                    problem.addConstraint(lambda before_satellite, after_satellite:
+                    add_constraint(lambda before_satellite, after_satellite, antenna_i=constraint_5[antenna_i], antenna_j=constraint_5[antenna_j]:
                                 not(            
-                                    (before_satellite == constraint_5[antenna_i] and after_satellite == constraint_5[antenna_j]) 
+                                    (before_satellite == antenna_i and after_satellite == antenna_j) 
                                     or 
-                                    (before_satellite == constraint_5[antenna_j] and after_satellite == constraint_5[antenna_i])
+                                    (before_satellite == antenna_j and after_satellite == antenna_i)
                                     ),(before_satellite,after_satellite))
-    # We print the problem solution
-    solutions = problem.getSolutions() 
-    print("There were found {}".format(len(solutions)))
-    
-    if len(solutions)>0:
-        print("An example of solution is:")
-        solution = solutions[0]
-        for variable,value in solution.items():
+    return problem
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''Assigns antennas to the slots of the satellites described in a JSON file, satisfying its constraints.
+        It prints the number of solutions and one of them.''',
+        epilog="""An example "python CSPScheduling.py tests/test1.json" """
+    )
+    parser.add_argument('file', help='JSON file with the data and the constraints')
+    parser.add_argument('--solver', choices=['native', 'constraint'], default='native',
+                        help='"native" for the bitset solver of engine.py with arc consistency or "constraint" for python-constraint')
+    parser.add_argument('--mode', choices=['summary', 'first', 'stream', 'count'], default='summary',
+                        help='"summary" prints the number of solutions and one of them, "first" only the first solution, '
+                             '"stream" the solutions as JSON lines and "count" only the number of solutions')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum number of solutions written by the stream mode')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes that solve the independent components of the native solver in parallel (0 for the number of cores)')
+    parser.add_argument('--symmetry', action='store_true',
+                        help='Search one representative of the solutions that swap interchangeable antennas and expand it back (native solver)')
+    parser.add_argument('--cache', default=default_cache_directory(),
+                        help='Directory of the compiled models of the native solver, keyed by the content of the JSON '
+                             '(default {})'.format(default_cache_directory()))
+    parser.add_argument('--no-cache', action='store_true', help='Parse the JSON and build the model of the native solver every time')
+    parser.add_argument('--optimize', choices=sorted(OBJECTIVES), default=None,
+                        help='Print the solution that minimizes an objective instead: "antennas" used or antenna "switches" '
+                             'between the consecutive slots of the satellites (native solver)')
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help='Seconds of the optimization, after them the best solution found so far is printed')
+    args = parser.parse_args()
+    if args.optimize is not None and args.solver != 'native':
+        parser.error("--optimize needs the native solver")
+
+    if args.solver == 'native' and not args.no_cache:
+        # An input that was compiled before is loaded from its binary image without parsing the JSON
+        model, _ = cached_model(args.file, args.cache)
+    else:
+        # Reading the input file that contains the data in json format
+        with open(args.file) as json_file:
+            file = json.load(json_file)
+            """
+            The JSON file has two main parts:
+            data: which specifies the combination of satellites and slots and their domain
+            constraints: which specifies the values for each constraint 
+            """
+            data = file["data"]
+            constraints = file["constraints"]
+        model = build_model(data, constraints) if args.solver == 'native' else None
+
+    if args.optimize is not None:
+        result = optimize(model, args.optimize, args.time_limit)
+        print("# nodes: {}".format(result.nodes))
+        print("# revisions: {}".format(result.revisions))
+        if result.solution is None:
+            print("There were found 0")
+            sys.exit(0)
+        print("The best solution has {} {} ({})".format(result.cost, args.optimize, result.status))
+        for variable,value in result.solution.items():
             print("{} is assigned to {}".format(variable,value))
-        
+        sys.exit(0)
+
+    # The solutions are generated one at a time and never stored in a list. The native solver splits the problem
+    # into independent components and counts the solutions without generating them
+    if args.solver == 'constraint':
+        counter = CheckCounter()
+        problem = build_problem(data, constraints, counter)
+        counters = lambda: [("constraint checks", counter.checks)]
+        solutions = lambda: problem.getSolutionIter()
+        count = lambda: sum(1 for _ in problem.getSolutionIter())
+        first = lambda: next(problem.getSolutionIter(), None)
+    else:
+        decomposition = Decomposition(model, args.workers, args.symmetry)
+        solutions = decomposition.solutions
+        count = decomposition.count
+        first = decomposition.first
+        counters = lambda: list(zip(("nodes", "revisions"), decomposition.counters()))
+
+    if args.mode == 'stream':
+        for number, solution in enumerate(solutions()):
+            if args.limit is not None and number >= args.limit:
+                break
+            print(json.dumps(solution))
+        sys.exit(0)
+
+    if args.mode in ('summary', 'count'):
+        # We print the problem solution
+        print("There were found {}".format(count()))
+
+    if args.mode in ('summary', 'first'):
+        solution = first()
+        if solution is not None:
+            print("An example of solution is:")
+            for variable,value in solution.items():
+                print("{} is assigned to {}".format(variable,value))
+        elif args.mode == 'first':
+            print("There were found 0")
+
+    # Counters of the search, stream mode leaves them out so its output stays JSON lines
+    for name, value in counters():
+        print("# {}: {}".format(name, value))
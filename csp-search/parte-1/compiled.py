@@ -0,0 +1,295 @@
+"""
+Compiled models: a compact binary image of a Model that is loaded without parsing the JSON or building the
+constraints again. The file starts with a header and is followed by sections, each one preceded by its length
+in bytes as an unsigned 64 bit integer. Integers are little endian and the arrays of integers are signed 32 bits.
+- antenna names, separated by zero bytes
+- slot names in the order of the JSON, separated by zero bytes
+- variable of every slot name
+- domains, domain_bytes bytes per variable
+- binary arcs as (x, y, kind) triples, kind is EQUAL, NOT_EQUAL or the index of a table
+- compatibility tables of the other arcs, domain_bytes bytes per antenna
+- global constraints, one array with the code of every constraint followed by its fields
+"""
+
+import argparse
+import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from engine import Model, build_model
+from global_constraints import AllDifferentGroups, ForbiddenConfigurations, ForbiddenPairs
+
+MAGIC = b"CSPM"
+VERSION = 1
+HEADER = struct.Struct("<4sIIIIIII")
+LENGTH = struct.Struct("<Q")
+
+# Kinds of the arcs that share the tables of the model
+EQUAL = -1
+NOT_EQUAL = -2
+
+# Codes of the global constraints
+ALL_DIFFERENT_GROUPS = 1
+FORBIDDEN_PAIRS = 2
+FORBIDDEN_CONFIGURATIONS = 3
+
+
+def int_array(values):
+    return array.array("i", values).tobytes()
+
+
+def antenna_list(bitset):
+    """
+    Returns the antennas of a bitset as a list of IDs
+    """
+    antennas = []
+    while bitset:
+        low = bitset & -bitset
+        antennas.append(low.bit_length() - 1)
+        bitset ^= low
+    return antennas
+
+
+def encode_constraint(constraint):
+    """
+    Returns the list of integers that encodes a global constraint
+    """
+    if isinstance(constraint, AllDifferentGroups):
+        fields = [ALL_DIFFERENT_GROUPS, len(constraint.groups)]
+        for group in constraint.groups:
+            fields += [len(group)] + group
+        return fields
+    if isinstance(constraint, ForbiddenPairs):
+        fields = [FORBIDDEN_PAIRS, len(constraint.first)] + constraint.first + [len(constraint.second)] + constraint.second
+        fields.append(len(constraint.forward))
+        for antenna, forbidden in constraint.forward.items():
+            others = antenna_list(forbidden)
+            fields += [antenna, len(others)] + others
+        return fields
+    if isinstance(constraint, ForbiddenConfigurations):
+        fields = [FORBIDDEN_CONFIGURATIONS, len(constraint.entries)]
+        for variables, antenna in constraint.entries:
+            fields += [antenna, len(variables)] + variables
+        return fields
+    raise ValueError("The constraint {} cannot be compiled".format(type(constraint).__name__))
+
+
+def decode_constraints(fields):
+    """
+    Generator of the global constraints encoded in a sequence of integers
+    """
+    position = 0
+
+    def take(count):
+        nonlocal position
+        values = list(fields[position:position + count])
+        position += count
+        return values
+
+    while position < len(fields):
+        code, = take(1)
+        if code == ALL_DIFFERENT_GROUPS:
+            groups = [take(take(1)[0]) for _ in range(take(1)[0])]
+            yield AllDifferentGroups(groups)
+        elif code == FORBIDDEN_PAIRS:
+            first = take(take(1)[0])
+            second = take(take(1)[0])
+            forward = {}
+            backward = {}
+            for _ in range(take(1)[0]):
+                antenna, count = take(2)
+                for other in take(count):
+                    forward[antenna] = forward.get(antenna, 0) | 1 << other
+                    backward[other] = backward.get(other, 0) | 1 << antenna
+            yield ForbiddenPairs(first, second, forward, backward)
+        elif code == FORBIDDEN_CONFIGURATIONS:
+            entries = []
+            for _ in range(take(1)[0]):
+                antenna, count = take(2)
+                entries.append((take(count), antenna))
+            yield ForbiddenConfigurations(entries)
+        else:
+            raise ValueError("Unknown constraint code {}".format(code))
+
+
+def compile_model(model):
+    """
+    Returns the binary image of a model
+    """
+    domain_bytes = max(1, (len(model.antennas) + 7) // 8)
+    arcs = []
+    tables = []
+    for x, neighbours in enumerate(model.arcs):
+        for y, table in neighbours.items():
+            if table is model._equal:
+                kind = EQUAL
+            elif table is model._not_equal:
+                kind = NOT_EQUAL
+            else:
+                kind = len(tables)
+                tables.append(table)
+            arcs += [x, y, kind]
+    constraints = []
+    for constraint in model.constraints:
+        constraints += encode_constraint(constraint)
+
+    sections = [
+        b"\0".join(antenna.encode() for antenna in model.antennas),
+        b"\0".join(name.encode() for name, _ in model.names),
+        int_array(variable for _, variable in model.names),
+        b"".join(domain.to_bytes(domain_bytes, "little") for domain in model.domains),
+        int_array(arcs),
+        b"".join(compatible.to_bytes(domain_bytes, "little") for table in tables for compatible in table),
+        int_array(constraints),
+    ]
+    header = HEADER.pack(MAGIC, VERSION, len(model.variables), len(model.names), len(model.antennas),
+                         domain_bytes, len(arcs) // 3, len(model.constraints))
+    return header + b"".join(LENGTH.pack(len(section)) + section for section in sections)
+
+
+def write_model(model, path):
+    """
+    Writes the binary image of a model to path, replacing the file at once so a reader never sees half a file
+    """
+    temporary = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary, "wb") as file:
+        file.write(compile_model(model))
+    os.replace(temporary, path)
+
+
+def load_model(path):
+    """
+    Loads a Model from a binary image. The file is memory mapped and its sections are read through memory views,
+    without copying the file.
+    """
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as image:
+            view = memoryview(image)
+            try:
+                return _read_model(view)
+            finally:
+                view.release()
+
+
+def _read_model(view):
+    magic, version, num_variables, num_names, num_antennas, domain_bytes, num_arcs, _ = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a compiled model of version {}".format(VERSION))
+    sections = []
+    position = HEADER.size
+    while position < len(view):
+        length, = LENGTH.unpack_from(view, position)
+        position += LENGTH.size
+        sections.append(view[position:position + length])
+        position += length
+    antenna_names, slot_names, name_variables, domains, arcs, tables, constraints = sections
+
+    model = Model()
+    model.antennas = bytes(antenna_names).decode().split("\0") if num_antennas else []
+    model.antenna_ids = {antenna: index for index, antenna in enumerate(model.antennas)}
+    names = bytes(slot_names).decode().split("\0") if num_names else []
+    model.names = list(zip(names, name_variables.cast("i")))
+    model.variables = [None] * num_variables
+    for name, variable in model.names:
+        model.variable_ids[name] = variable
+        if model.variables[variable] is None:
+            model.variables[variable] = name
+        satellite = name.rsplit(" ", 1)[0]
+        variables = model.satellites.setdefault(satellite, [])
+        if variable not in variables:
+            variables.append(variable)
+    model.domains = [int.from_bytes(domains[index * domain_bytes:(index + 1) * domain_bytes], "little")
+                     for index in range(num_variables)]
+    model.arcs = [{} for _ in range(num_variables)]
+    model.watchers = [[] for _ in range(num_variables)]
+
+    arcs = arcs.cast("i")
+    row = num_antennas * domain_bytes
+    for index in range(num_arcs):
+        x, y, kind = arcs[3 * index:3 * index + 3]
+        if kind == EQUAL:
+            if model._equal is None:
+                model._equal = [1 << antenna for antenna in range(num_antennas)]
+            table = model._equal
+        elif kind == NOT_EQUAL:
+            if model._not_equal is None:
+                model._not_equal = [model.all_antennas ^ (1 << antenna) for antenna in range(num_antennas)]
+            table = model._not_equal
+        else:
+            start = kind * row
+            table = [int.from_bytes(tables[start + antenna * domain_bytes:start + (antenna + 1) * domain_bytes], "little")
+                     for antenna in range(num_antennas)]
+        model.arcs[x][y] = table
+
+    for constraint in decode_constraints(constraints.cast("i")):
+        model.add_constraint(constraint)
+    return model
+
+
+def default_cache_directory():
+    """
+    Default directory of the compiled models: csp-scheduling/models under $XDG_CACHE_HOME, under ~/.cache when it
+    is not set, or under the temporary directory when the user has no home
+    """
+    base = os.environ.get("XDG_CACHE_HOME")
+    if not base:
+        home = os.path.expanduser("~")
+        base = os.path.join(home, ".cache") if home != "~" else tempfile.gettempdir()
+    return os.path.join(base, "csp-scheduling", "models")
+
+
+def content_key(content):
+    """
+    Key of the cache of an input file: the hash of its content and of the version of the format
+    """
+    return hashlib.sha256(content + VERSION.to_bytes(4, "little")).hexdigest()
+
+
+def cached_model(path, cache_directory):
+    """
+    Returns the Model of an input JSON, loading its compiled image from cache_directory if the same content was
+    compiled before. Otherwise the JSON is parsed, the model built and its image stored in the cache.
+
+    *Returns:
+    - the Model
+    - True if it was loaded from the cache
+    """
+    with open(path, "rb") as file:
+        content = file.read()
+    cached = os.path.join(cache_directory, content_key(content) + ".cspm")
+    if os.path.exists(cached):
+        try:
+            return load_model(cached), True
+        except (ValueError, struct.error):
+            # A damaged image is compiled again
+            pass
+    problem = json.loads(content)
+    model = build_model(problem["data"], problem["constraints"])
+    os.makedirs(cache_directory, exist_ok=True)
+    write_model(model, cached)
+    return model, False
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''Compiles input JSON files into binary models stored in a cache directory, so CSPScheduling.py
+        loads them without parsing the JSON or building the constraints. The cache is keyed by the content of the
+        files, so a file that changes is compiled again.''',
+        epilog="""An example "python compiled.py tests/*.json" """
+    )
+    parser.add_argument('files', nargs='+', help='JSON files with the data and the constraints')
+    parser.add_argument('--cache', default=default_cache_directory(),
+                        help='Directory of the compiled models (default {})'.format(default_cache_directory()))
+    args = parser.parse_args()
+
+    for path in args.files:
+        model, hit = cached_model(path, args.cache)
+        print("{}: {} variables, {} antennas, {}".format(path, len(model.variables), len(model.antennas),
+                                                        "already compiled" if hit else "compiled"))
+    sys.exit(0)
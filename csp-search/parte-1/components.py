@@ -0,0 +1,226 @@
+import concurrent.futures
+import itertools
+import os
+import pickle
+
+from engine import Solver
+from symmetry import SymmetricSolver, interchangeable_antennas
+
+# Components with at most this number of solutions are enumerated once and kept in memory, the bigger ones are
+# searched again every time the enumeration needs them
+CACHED_SOLUTIONS = 4096
+
+
+# Solver and arc consistent domains of the problem, set in every worker by the pool initializer
+_solver = None
+_domains = None
+
+
+def _initialize(serialized_model, domains, classes):
+    """
+    Initializer of the worker processes, the model is unpickled once per worker instead of once per component
+    """
+    global _solver, _domains
+    model = pickle.loads(serialized_model)
+    _solver = Solver(model) if classes is None else SymmetricSolver(model, classes)
+    _domains = domains
+
+
+def is_symmetric(solver, domains, component):
+    """
+    True if the solver breaks the symmetries of interchangeable antennas and the component can take two
+    antennas of the same class
+    """
+    if not isinstance(solver, SymmetricSolver):
+        return False
+    antennas = 0
+    for variable in component:
+        antennas |= domains[variable]
+    return any((antennas & symmetric).bit_count() > 1 for symmetric in solver.classes)
+
+
+def count_component(solver, domains, component):
+    """
+    Number of assignments of the variables of a component. When the component has interchangeable antennas, the
+    multiplicities of the representatives are added up, otherwise the solutions are counted by decomposition.
+    """
+    if is_symmetric(solver, domains, component):
+        return solver.count_symmetric(domains, component)
+    return solver.count(domains, component)
+
+
+def first_component(solver, domains, component):
+    """
+    First assignment of the variables of a component as a list of (variable, domain) pairs, or None if there is none
+    """
+    for solution in solver.search(domains, component):
+        return [(variable, solution[variable]) for variable in component]
+    return None
+
+
+def _counted(function, component):
+    """
+    Applies function to a component in a worker and returns its result with the nodes and revisions it took,
+    so the counters of the searches in the pool are added up in the main process
+    """
+    nodes, revisions = _solver.nodes, _solver.revisions
+    result = function(_solver, _domains, component)
+    return result, _solver.nodes - nodes, _solver.revisions - revisions
+
+
+def _count(component):
+    return _counted(count_component, component)
+
+
+def _first(component):
+    return _counted(first_component, component)
+
+
+class Decomposition:
+    """
+    Splits a Model into the connected components of its constraint graph, after making its domains arc
+    consistent, and solves each component on its own. The variables left with a single antenna by the
+    propagation do not belong to any component.
+
+    The number of solutions is the product of the counts of the components, the first solution joins the first
+    solution of every component and the solutions are enumerated lazily as their Cartesian product. When
+    workers is more than 1 and there are several components, the counts and the first solutions of the
+    components are computed in a pool of worker processes.
+
+    If symmetry is set, the classes of interchangeable antennas are found after the propagation and every
+    component only searches one representative of the solutions that permute them (see symmetry.py). The
+    representatives are expanded back when the solutions are enumerated and counted by multiplicity.
+
+    The nodes and revisions of every search, including the ones done in the worker processes, are added up in
+    counters() for the statistics.
+    """
+    def __init__(self, model, workers=1, symmetry=False):
+        self.model = model
+        self.workers = workers
+        # Nodes and revisions of the searches done in worker processes
+        self.pool_nodes = 0
+        self.pool_revisions = 0
+        # Solver of the components without interchangeable antennas, shared by their enumerations
+        self.solver = self.plain_solver = Solver(model)
+        self.domains = self.solver.initial_domains()
+        self.classes = None
+        if self.domains is None:
+            self.components = []
+        else:
+            self.components = self.solver.components(self.domains, range(len(self.domains)))
+            if symmetry:
+                self.classes = interchangeable_antennas(model, self.domains)
+                self.solver = SymmetricSolver(model, self.classes)
+
+    def _map(self, worker, function):
+        """
+        Applies function (serial) or worker (in the pool) to every component and returns the list of results
+        """
+        workers = self.workers or os.cpu_count() or 1
+        if workers <= 1 or len(self.components) <= 1:
+            return [function(self.solver, self.domains, component) for component in self.components]
+        serialized_model = pickle.dumps(self.model, pickle.HIGHEST_PROTOCOL)
+        chunksize = max(1, len(self.components) // (4 * workers))
+        with concurrent.futures.ProcessPoolExecutor(workers, initializer=_initialize, initargs=(serialized_model, self.domains, self.classes)) as executor:
+            results = []
+            for result, nodes, revisions in executor.map(worker, self.components, chunksize=chunksize):
+                results.append(result)
+                self.pool_nodes += nodes
+                self.pool_revisions += revisions
+            return results
+
+    def counters(self):
+        """
+        Returns the nodes (assignments tried) and revisions (arcs revised and global constraints propagated) of
+        every search done so far
+        """
+        nodes, revisions = self.pool_nodes, self.pool_revisions
+        solvers = [self.solver] if self.plain_solver is self.solver else [self.solver, self.plain_solver]
+        for solver in solvers:
+            nodes += solver.nodes
+            revisions += solver.revisions
+        return nodes, revisions
+
+    def count(self):
+        """
+        Returns the number of solutions
+        """
+        if self.domains is None:
+            return 0
+        total = 1
+        for count in self._map(_count, count_component):
+            total *= count
+        return total
+
+    def first(self):
+        """
+        Returns the first solution as a dictionary from variable names to antennas or None if there is none
+        """
+        if self.domains is None:
+            return None
+        domains = list(self.domains)
+        for assignment in self._map(_first, first_component):
+            if assignment is None:
+                return None
+            for variable, domain in assignment:
+                domains[variable] = domain
+        return self.model.solution(domains)
+
+    def _factory(self, component):
+        """
+        Returns a function that creates an iterator over the assignments of a component, as lists of (variable,
+        domain) pairs. The assignments of the small components are computed once and reused.
+        """
+        if is_symmetric(self.solver, self.domains, component):
+            def search():
+                for solution in self.solver.search(self.domains, component):
+                    yield from self.solver.expand([(variable, solution[variable]) for variable in component])
+        else:
+            def search():
+                for solution in self.plain_solver.search(self.domains, component):
+                    yield [(variable, solution[variable]) for variable in component]
+
+        # Only the first solutions are generated to decide, counting a big component could take much longer
+        cached = list(itertools.islice(search(), CACHED_SOLUTIONS + 1))
+        if len(cached) <= CACHED_SOLUTIONS:
+            return lambda: iter(cached)
+        return search
+
+    def solutions(self, limit=None):
+        """
+        Generator of the solutions as dictionaries from variable names to antennas, at most limit of them if it is
+        given. The Cartesian product of the components advances like an odometer, so only one assignment of
+        every component is kept at a time besides the cached ones.
+        """
+        if self.domains is None:
+            return
+        factories = [self._factory(component) for component in self.components]
+        iterators = [factory() for factory in factories]
+        current = []
+        for iterator in iterators:
+            assignment = next(iterator, None)
+            if assignment is None:
+                return
+            current.append(assignment)
+
+        domains = list(self.domains)
+        generated = 0
+        while limit is None or generated < limit:
+            for assignment in current:
+                for variable, domain in assignment:
+                    domains[variable] = domain
+            yield self.model.solution(domains)
+            generated += 1
+
+            # Advancing the last component and restarting the ones that are exhausted
+            index = len(iterators) - 1
+            while index >= 0:
+                assignment = next(iterators[index], None)
+                if assignment is not None:
+                    current[index] = assignment
+                    break
+                iterators[index] = factories[index]()
+                current[index] = next(iterators[index])
+                index -= 1
+            if index < 0:
+                return
@@ -0,0 +1,501 @@
+import sys
+from collections import deque
+
+from global_constraints import AllDifferentGroups, ForbiddenConfigurations, ForbiddenPairs
+
+
+def separate_frames(data):
+    """
+    Receives the data dictionary extracted from the input JSON
+    Separates all the variables into two sets:
+    - before noon
+    - after noon
+    """
+    before_noon = []
+    after_noon = []
+    # data items is a dictionary in which the keys are the satellites and the elements are keys
+    for satellite, slots in data.items():
+        for slot in slots.keys():
+            # Getting the starting time of the slot (they are represented as <start>-<end>)
+            start_time = int(slot.split("-")[0])
+            #  Dividing variables before and after noon
+            if start_time < 12:
+                before_noon.append(satellite + " " + slot)
+            else:
+                after_noon.append(satellite + " " + slot)
+    return before_noon, after_noon
+
+
+def values(domain):
+    """
+    Iterates over the antenna IDs of a bitset domain in ascending order
+    """
+    while domain:
+        low = domain & -domain
+        yield low.bit_length() - 1
+        domain ^= low
+
+
+class Model:
+    """
+    Antenna assignment problem with integer variables and antennas.
+
+    Variables are the slots of the satellites, named "<satellite> <slot>" and numbered in the order of the JSON.
+    Slots that must take the same antenna can share one variable: names lists every slot name with its variable,
+    in the order of the JSON, and variables has the name of the first slot of every variable. Antennas are numbered in the order they first appear in the domains, and every domain is a bitset where the
+    bit i is set if the antenna i is allowed. Binary constraints are stored as compatibility tables: arcs[x][y]
+    is a list with one bitset per antenna a, the antennas of y compatible with x = a. Both directions of every
+    constraint are stored and the constraints between the same pair of variables are merged into one table.
+    The constraints over many variables are objects of global_constraints.py kept in constraints, and
+    watchers[x] lists the ones that constrain x.
+    """
+    def __init__(self):
+        self.variables = []
+        self.names = []
+        self.variable_ids = {}
+        self.satellites = {}
+        self.antennas = []
+        self.antenna_ids = {}
+        self.domains = []
+        self.arcs = []
+        self.constraints = []
+        self.watchers = []
+        # Shared tables of the equal and not equal constraints, created when the antennas are known
+        self._equal = None
+        self._not_equal = None
+
+    @property
+    def all_antennas(self):
+        return (1 << len(self.antennas)) - 1
+
+    def add_variable(self, satellite, slot, antennas, merge_with=None):
+        """
+        Adds the variable of one slot of a satellite with its list of antennas and returns its index.
+        Repeated antennas in the list are only stored once. If merge_with is the index of a variable, the slot
+        must take the same antenna, so it shares that variable, whose domain keeps the common antennas.
+        """
+        name = satellite + " " + slot
+        domain = 0
+        for antenna in antennas:
+            if antenna not in self.antenna_ids:
+                self.antenna_ids[antenna] = len(self.antennas)
+                self.antennas.append(antenna)
+            domain |= 1 << self.antenna_ids[antenna]
+        if merge_with is None:
+            index = len(self.variables)
+            self.variables.append(name)
+            self.domains.append(domain)
+            self.arcs.append({})
+            self.watchers.append([])
+        else:
+            index = merge_with
+            self.domains[index] &= domain
+        self.names.append((name, index))
+        self.variable_ids[name] = index
+        variables = self.satellites.setdefault(satellite, [])
+        if index not in variables:
+            variables.append(index)
+        return index
+
+    def _merge(self, x, y, table):
+        """
+        Adds the compatibility table of x with y, intersecting it with the table of a previous constraint
+        """
+        previous = self.arcs[x].get(y)
+        if previous is None:
+            self.arcs[x][y] = table
+        else:
+            self.arcs[x][y] = [old & new for old, new in zip(previous, table)]
+
+    def add_equal(self, x, y):
+        """
+        x and y must take the same antenna
+        """
+        if x == y:
+            return
+        if self._equal is None:
+            self._equal = [1 << antenna for antenna in range(len(self.antennas))]
+        self._merge(x, y, self._equal)
+        self._merge(y, x, self._equal)
+
+    def add_not_equal(self, x, y):
+        """
+        x and y must take different antennas, a variable different from itself has no solution
+        """
+        if x == y:
+            self.domains[x] = 0
+            return
+        if self._not_equal is None:
+            self._not_equal = [self.all_antennas ^ (1 << antenna) for antenna in range(len(self.antennas))]
+        self._merge(x, y, self._not_equal)
+        self._merge(y, x, self._not_equal)
+
+    def add_forbidden_pair(self, x, antenna_x, y, antenna_y):
+        """
+        x and y cannot take the antennas antenna_x and antenna_y at the same time. Antennas that are not in any
+        domain cannot be taken, so the constraint is ignored for them.
+        """
+        a = self.antenna_ids.get(antenna_x)
+        b = self.antenna_ids.get(antenna_y)
+        if a is None or b is None:
+            return
+        if x == y:
+            if a == b:
+                self.domains[x] &= ~(1 << a)
+            return
+        table = [self.all_antennas] * len(self.antennas)
+        table[a] ^= 1 << b
+        self._merge(x, y, table)
+        table = [self.all_antennas] * len(self.antennas)
+        table[b] ^= 1 << a
+        self._merge(y, x, table)
+
+    def add_constraint(self, constraint):
+        """
+        Adds a global constraint and returns it
+        """
+        self.constraints.append(constraint)
+        for variable in constraint.variables:
+            self.watchers[variable].append(constraint)
+        return constraint
+
+    def add_all_different_groups(self, groups):
+        """
+        The variables of different groups must take different antennas. A variable in two groups, such as the
+        variables of a group that appears twice, has to be different from itself, so it has no solution.
+        """
+        seen = set()
+        disjoint = []
+        for group in groups:
+            repeated = seen.intersection(group)
+            for variable in repeated:
+                self.domains[variable] = 0
+            seen.update(group)
+            disjoint.append([variable for variable in dict.fromkeys(group) if variable not in repeated])
+        disjoint = [group for group in disjoint if group]
+        if len(disjoint) > 1:
+            self.add_constraint(AllDifferentGroups(disjoint))
+
+    def add_forbidden_configurations(self, entries):
+        """
+        entries is a list of (variables, antenna name) pairs. For two different entries, a variable of the first
+        one cannot take its antenna while a different variable of the second one takes its own. A variable in two
+        entries with the same antenna cannot take it.
+        """
+        entries = [(variables, self.antenna_ids[antenna]) for variables, antenna in entries if antenna in self.antenna_ids]
+        for i in range(len(entries) - 1):
+            for j in range(i + 1, len(entries)):
+                if entries[i][1] == entries[j][1]:
+                    for variable in set(entries[i][0]) & set(entries[j][0]):
+                        self.domains[variable] &= ~(1 << entries[i][1])
+        if len(entries) > 1:
+            self.add_constraint(ForbiddenConfigurations(entries))
+
+    def add_forbidden_pairs(self, first, second, pairs):
+        """
+        A variable of first and a variable of second cannot take any of the pairs of antenna names. A variable in
+        both, made of slots of first and second that were merged, cannot take an antenna forbidden with itself.
+        """
+        first = list(dict.fromkeys(first))
+        second = list(dict.fromkeys(second))
+        forward = {}
+        backward = {}
+        for antenna_first, antenna_second in pairs:
+            a = self.antenna_ids.get(antenna_first)
+            b = self.antenna_ids.get(antenna_second)
+            if a is not None and b is not None:
+                forward[a] = forward.get(a, 0) | 1 << b
+                backward[b] = backward.get(b, 0) | 1 << a
+        for variable in set(first).intersection(second):
+            for antenna, forbidden in forward.items():
+                if forbidden >> antenna & 1:
+                    self.domains[variable] &= ~(1 << antenna)
+        if forward and first and second:
+            self.add_constraint(ForbiddenPairs(first, second, forward, backward))
+
+    def slots(self, satellite):
+        """
+        Returns the variables of every slot of a satellite
+        """
+        return self.satellites.get(satellite, [])
+
+    def solution(self, domains):
+        """
+        Returns the assignment of a list of singleton domains as a dictionary from variable names to antennas
+        """
+        return {name: self.antennas[domains[variable].bit_length() - 1] for name, variable in self.names}
+
+
+def build_model(data, constraints):
+    """
+    Builds the Model of the "data" and "constraints" parts of an input JSON with the same constraints as
+    CSPScheduling.py. The slots of constraint_2 share a single variable and every other family of constraints
+    is one global constraint, so the model grows linearly with the input:
+    - constraint_2: every slot of the satellites uses the same antenna
+    - constraint_3: the slots of two different satellites of the list use different antennas
+    - constraint_4: for every two satellites of the list, the first cannot use its antenna while the second uses its own
+    - constraint_5: a slot starting before noon and a slot starting after noon cannot use two different antennas of the list
+    """
+    model = Model()
+    same = set(constraints["constraint_2"])
+    merged = None
+    for satellite, slots in data.items():
+        for slot, antennas in slots.items():
+            if satellite in same:
+                merged = model.add_variable(satellite, slot, antennas, merged)
+            else:
+                model.add_variable(satellite, slot, antennas)
+
+    model.add_all_different_groups([model.slots(satellite) for satellite in constraints["constraint_3"]])
+
+    model.add_forbidden_configurations([(model.slots(satellite), antenna) for satellite, antenna in constraints["constraint_4"]])
+
+    before_noon, after_noon = separate_frames(data)
+    antennas = constraints["constraint_5"]
+    pairs = []
+    for i in range(len(antennas) - 1):
+        for j in range(i + 1, len(antennas)):
+            pairs.append((antennas[i], antennas[j]))
+            pairs.append((antennas[j], antennas[i]))
+    model.add_forbidden_pairs([model.variable_ids[name] for name in before_noon],
+                              [model.variable_ids[name] for name in after_noon], pairs)
+    return model
+
+
+class Solver:
+    """
+    Backtracking search that maintains arc consistency (MAC) over the bitset domains of a Model.
+
+    AC-3 is run once before the search and after every assignment, only from the assigned variable. When the
+    domain of a variable changes, the arcs towards it are revised and its global constraints propagated.
+    The next variable is the one with the smallest domain (MRV), breaking ties with the highest number of
+    constrained neighbours (degree), and its antennas are tried in ascending ID. The counters nodes
+    (assignments tried) and revisions (arcs revised and global constraints propagated) are kept for the statistics.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.degree = [len(arcs) + sum(constraint.degree(variable) for constraint in watchers)
+                       for variable, (arcs, watchers) in enumerate(zip(model.arcs, model.watchers))]
+        self.nodes = 0
+        self.revisions = 0
+
+    def revise(self, domains, x, y):
+        """
+        Removes from the domain of x the antennas without a compatible antenna in the domain of y.
+
+        *Returns:
+        - True if the domain of x changed
+        """
+        self.revisions += 1
+        table = self.model.arcs[x][y]
+        domain_y = domains[y]
+        kept = domain = domains[x]
+        while domain:
+            low = domain & -domain
+            if not table[low.bit_length() - 1] & domain_y:
+                kept ^= low
+            domain ^= low
+        if kept != domains[x]:
+            domains[x] = kept
+            return True
+        return False
+
+    def propagate(self, domains, queue):
+        """
+        AC-3 over variables: for every variable of queue, and every variable whose domain changes later, revises
+        the arcs towards it and propagates its global constraints until no domain changes.
+
+        *Returns:
+        - False if a domain became empty
+        """
+        arcs = self.model.arcs
+        watchers = self.model.watchers
+        pending = set(queue)
+        queue = deque(queue)
+        while queue:
+            y = queue.popleft()
+            pending.discard(y)
+            for x in arcs[y]:
+                if self.revise(domains, x, y):
+                    if not domains[x]:
+                        return False
+                    if x not in pending:
+                        pending.add(x)
+                        queue.append(x)
+            for constraint in watchers[y]:
+                self.revisions += 1
+                changed = constraint.propagate(domains, y)
+                if changed is None:
+                    return False
+                for x in changed:
+                    if x not in pending:
+                        pending.add(x)
+                        queue.append(x)
+        return True
+
+    def select(self, domains, variables=None):
+        """
+        Returns the unassigned variable, among variables if they are given, with the smallest domain and the
+        highest degree, or None if every domain has a single antenna
+        """
+        best = None
+        best_key = None
+        for variable in range(len(domains)) if variables is None else variables:
+            domain = domains[variable]
+            if domain & (domain - 1):
+                key = (domain.bit_count(), -self.degree[variable])
+                if best_key is None or key < best_key:
+                    best, best_key = variable, key
+        return best
+
+    def branch(self, domains, variable, variables=None):
+        """
+        Returns the bitset of antennas tried for variable, all the antennas of its domain
+        """
+        return domains[variable]
+
+    def initial_domains(self):
+        """
+        Returns the domains of the model made arc consistent, or None if the problem has no solution
+        """
+        domains = list(self.model.domains)
+        if not all(domains):
+            return None
+        if not self.propagate(domains, range(len(domains))):
+            return None
+        return domains
+
+    def search(self, domains=None, variables=None):
+        """
+        Generator of the solutions as lists of singleton domains, one per variable. The search uses an explicit
+        stack, so its depth is not limited by the recursion limit.
+
+        If variables is given, only those variables are assigned, starting from arc consistent domains: it must be
+        a component of the problem (see components), so the other variables keep their domains.
+        """
+        if domains is None:
+            domains = self.initial_domains()
+            if domains is None:
+                return
+        variable = self.select(domains, variables)
+        if variable is None:
+            yield domains
+            return
+        stack = [(domains, variable, self.branch(domains, variable, variables))]
+        while stack:
+            domains, variable, remaining = stack.pop()
+            if not remaining:
+                continue
+            low = remaining & -remaining
+            stack.append((domains, variable, remaining ^ low))
+            self.nodes += 1
+            child = list(domains)
+            child[variable] = low
+            if not self.propagate(child, [variable]):
+                continue
+            next_variable = self.select(child, variables)
+            if next_variable is None:
+                yield child
+            else:
+                stack.append((child, next_variable, self.branch(child, next_variable, variables)))
+
+    def solutions(self, limit=None):
+        """
+        Generator of the solutions as dictionaries from variable names to antennas. Solutions are built one at a
+        time when they are requested, and at most limit of them are generated if it is given.
+        """
+        for number, domains in enumerate(self.search()):
+            if limit is not None and number >= limit:
+                return
+            yield self.model.solution(domains)
+
+    def first(self):
+        """
+        Returns the first solution or None if there is none
+        """
+        return next(self.solutions(), None)
+
+    def components(self, domains, variables):
+        """
+        Splits the variables into the connected components of the constraint graph, ignoring the variables
+        with a single antenna left. Once the domains are arc consistent, a variable with a single antenna is
+        compatible with every antenna left in its neighbours, so it does not connect them.
+        """
+        arcs = self.model.arcs
+        free = {variable for variable in variables if domains[variable] & (domains[variable] - 1)}
+        parent = {variable: variable for variable in free}
+
+        def find(variable):
+            while parent[variable] != variable:
+                parent[variable] = parent[parent[variable]]
+                variable = parent[variable]
+            return variable
+
+        constraints = {}
+        for variable in free:
+            for neighbour in arcs[variable]:
+                if neighbour in free:
+                    parent[find(neighbour)] = find(variable)
+            for constraint in self.model.watchers[variable]:
+                constraints[id(constraint)] = constraint
+        for constraint in constraints.values():
+            for linked in constraint.links(domains, free):
+                root = find(linked[0])
+                for variable in linked[1:]:
+                    parent[find(variable)] = root
+
+        components = {}
+        for variable in sorted(free):
+            components.setdefault(find(variable), []).append(variable)
+        return list(components.values())
+
+    def count(self, domains=None, variables=None):
+        """
+        Returns the number of solutions without building them, or the number of assignments of variables if they
+        are given, as in search.
+
+        After every assignment and propagation, the unassigned variables are split into independent components
+        whose counts are multiplied, and the count of every component is memoized by the domains of its
+        variables, so components that appear again in other branches are not searched again.
+        """
+        if domains is None:
+            domains = self.initial_domains()
+            if domains is None:
+                return 0
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * len(domains) + 100))
+        memo = {}
+        return self._count(domains, range(len(domains)) if variables is None else variables, memo)
+
+    def _count(self, domains, variables, memo):
+        """
+        Number of solutions of the variables given the arc consistent domains, as the product of their components
+        """
+        if len(variables) == 1:
+            return domains[variables[0]].bit_count()
+        total = 1
+        for component in self.components(domains, variables):
+            total *= self._count_component(domains, component, memo)
+            if not total:
+                return 0
+        return total
+
+    def _count_component(self, domains, component, memo):
+        """
+        Number of solutions of a connected component, branching on its variable with the smallest domain
+        """
+        key = (tuple(component), tuple(domains[variable] for variable in component))
+        if key in memo:
+            return memo[key]
+        variable = min(component, key=lambda variable: (domains[variable].bit_count(), -self.degree[variable]))
+        total = 0
+        remaining = domains[variable]
+        while remaining:
+            low = remaining & -remaining
+            remaining ^= low
+            self.nodes += 1
+            child = list(domains)
+            child[variable] = low
+            if self.propagate(child, [variable]):
+                total += self._count(child, component, memo)
+        memo[key] = total
+        return total
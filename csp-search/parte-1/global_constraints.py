@@ -0,0 +1,222 @@
+"""
+Global constraints of the antenna assignment problem. Each one replaces a family of binary constraints that
+would need a number of arcs quadratic in the number of slots, and keeps the same pruning as arc consistency on
+those binary constraints: a binary constraint that forbids one pair of antennas only removes an antenna from a
+variable once the other variable has a single antenna left, so the propagators only act when one of their
+variables becomes assigned, in time linear in the variables of the constraint.
+
+Every constraint has:
+- variables: the variables it constrains, without repetitions
+- antennas: bitset of the antennas that the constraint treats differently from the others. Two antennas outside
+  it can be swapped in any solution of the constraint and it is still a solution
+- propagate(domains, variable): prunes the domains after the domain of variable changed and returns the list of
+  variables whose domain changed, or None if a domain became empty
+- degree(variable): number of variables constrained together with variable
+- links(domains, free): lists of the free variables that are still constrained together, used to split the
+  problem into independent components. They may join more variables than needed, never less.
+- conflicts(domains, variable): variables with a single antenna that the constraint forbids together with the
+  single antenna of variable, used to find the slots of a previous solution broken by a change
+"""
+
+
+def is_assigned(domain):
+    """
+    True if the bitset domain has a single antenna
+    """
+    return not domain & (domain - 1)
+
+
+def remove(domains, variables, forbidden, changed, skip=None):
+    """
+    Removes the antennas of the bitset forbidden from the domains of variables, except skip, adding the variables
+    whose domain changed to changed.
+
+    *Returns:
+    - False if a domain became empty
+    """
+    for other in variables:
+        if other != skip and domains[other] & forbidden:
+            domains[other] &= ~forbidden
+            if not domains[other]:
+                return False
+            changed.append(other)
+    return True
+
+
+def assigned_to(domains, variables, antennas, skip=None):
+    """
+    Returns the variables, except skip, whose domain is a single antenna of the bitset antennas
+    """
+    return [other for other in variables
+            if other != skip and domains[other] & antennas and is_assigned(domains[other])]
+
+
+def constrained(variables, members, free):
+    """
+    Returns the free variables of a constraint, iterating over the shorter of its variables and free. members is
+    a set or dictionary with the variables of the constraint.
+    """
+    if len(free) < len(variables):
+        return sorted(variable for variable in free if variable in members)
+    return [variable for variable in variables if variable in free]
+
+
+class AllDifferentGroups:
+    """
+    Variables of different groups take different antennas, variables of the same group may share antennas
+    (constraint_3, a group has the slots of one satellite). The groups must be disjoint.
+    """
+    def __init__(self, groups):
+        self.groups = [list(group) for group in groups]
+        self.variables = [variable for group in self.groups for variable in group]
+        self.group_of = {variable: index for index, group in enumerate(self.groups) for variable in group}
+        self.antennas = 0
+
+    def propagate(self, domains, variable):
+        domain = domains[variable]
+        if not is_assigned(domain):
+            return []
+        changed = []
+        own = self.group_of[variable]
+        for index, group in enumerate(self.groups):
+            if index != own and not remove(domains, group, domain, changed):
+                return None
+        return changed
+
+    def degree(self, variable):
+        return len(self.variables) - len(self.groups[self.group_of[variable]])
+
+    def links(self, domains, free):
+        # Two variables are only constrained if they can take the same antenna, so the variables are joined by
+        # antenna when the antenna is in the domains of more than one group
+        by_antenna = {}
+        for variable in constrained(self.variables, self.group_of, free):
+            domain = domains[variable]
+            while domain:
+                low = domain & -domain
+                by_antenna.setdefault(low, []).append(variable)
+                domain ^= low
+        return [linked for linked in by_antenna.values()
+                if len({self.group_of[variable] for variable in linked}) > 1]
+
+    def conflicts(self, domains, variable):
+        own = self.group_of[variable]
+        return [other for index, group in enumerate(self.groups) if index != own
+                for other in assigned_to(domains, group, domains[variable])]
+
+
+class ForbiddenPairs:
+    """
+    A variable of first and a variable of second cannot take a forbidden pair of antennas (constraint_5, first and
+    second are the slots starting before and after noon). forward maps an antenna a to the bitset of antennas b
+    such that (a, b) is forbidden, and backward maps b to the bitset of antennas a.
+    """
+    def __init__(self, first, second, forward, backward):
+        self.first = list(first)
+        self.second = list(second)
+        self.forward = forward
+        self.backward = backward
+        self.first_set = set(self.first)
+        self.second_set = set(self.second)
+        self.variables = list(dict.fromkeys(self.first + self.second))
+        self.forward_antennas = sum(1 << antenna for antenna in forward)
+        self.backward_antennas = sum(1 << antenna for antenna in backward)
+        self.antennas = self.forward_antennas | self.backward_antennas
+
+    def propagate(self, domains, variable):
+        domain = domains[variable]
+        if not is_assigned(domain):
+            return []
+        antenna = domain.bit_length() - 1
+        changed = []
+        if variable in self.first_set:
+            forbidden = self.forward.get(antenna)
+            if forbidden and not remove(domains, self.second, forbidden, changed, variable):
+                return None
+        if variable in self.second_set:
+            forbidden = self.backward.get(antenna)
+            if forbidden and not remove(domains, self.first, forbidden, changed, variable):
+                return None
+        return changed
+
+    def degree(self, variable):
+        return (len(self.second) if variable in self.first_set else 0) + (len(self.first) if variable in self.second_set else 0)
+
+    def links(self, domains, free):
+        # Only the variables that can still take both antennas of a forbidden pair are constrained, so the
+        # variables of first that can take a are joined with the variables of second that can take forward[a]
+        first = [variable for variable in constrained(self.first, self.first_set, free) if domains[variable] & self.forward_antennas]
+        second = [variable for variable in constrained(self.second, self.second_set, free) if domains[variable] & self.backward_antennas]
+        links = []
+        for antenna, forbidden in self.forward.items():
+            linked = [variable for variable in first if domains[variable] >> antenna & 1]
+            if linked:
+                others = [variable for variable in second if domains[variable] & forbidden]
+                if others:
+                    links.append(linked + others)
+        return links
+
+    def conflicts(self, domains, variable):
+        antenna = domains[variable].bit_length() - 1
+        result = []
+        if variable in self.first_set and antenna in self.forward:
+            result += assigned_to(domains, self.second, self.forward[antenna], variable)
+        if variable in self.second_set and antenna in self.backward:
+            result += assigned_to(domains, self.first, self.backward[antenna], variable)
+        return result
+
+
+class ForbiddenConfigurations:
+    """
+    entries is a list of (variables, antenna) pairs. For two different entries, a variable of the first one
+    cannot take its antenna while a different variable of the second one takes its own (constraint_4, the
+    variables of an entry are the slots of one satellite).
+    """
+    def __init__(self, entries):
+        self.entries = [(list(variables), antenna) for variables, antenna in entries]
+        self.entries_of = {}
+        for index, (variables, _) in enumerate(self.entries):
+            for variable in variables:
+                self.entries_of.setdefault(variable, []).append(index)
+        self.variables = list(self.entries_of)
+        self.antennas = 0
+        for _, antenna in self.entries:
+            self.antennas |= 1 << antenna
+
+    def propagate(self, domains, variable):
+        domain = domains[variable]
+        if not is_assigned(domain):
+            return []
+        changed = []
+        for index in self.entries_of[variable]:
+            if domain != 1 << self.entries[index][1]:
+                continue
+            for other, (variables, antenna) in enumerate(self.entries):
+                if other != index and not remove(domains, variables, 1 << antenna, changed, variable):
+                    return None
+        return changed
+
+    def degree(self, variable):
+        return sum(len(variables) for index, (variables, _) in enumerate(self.entries)
+                   if index not in self.entries_of[variable])
+
+    def links(self, domains, free):
+        linked = set()
+        entries = set()
+        for variable in constrained(self.variables, self.entries_of, free):
+            for index in self.entries_of[variable]:
+                if domains[variable] >> self.entries[index][1] & 1:
+                    entries.add(index)
+                    linked.add(variable)
+        if len(entries) > 1:
+            return [sorted(linked)]
+        return []
+
+    def conflicts(self, domains, variable):
+        result = []
+        for index in self.entries_of[variable]:
+            if domains[variable] == 1 << self.entries[index][1]:
+                for other, (variables, antenna) in enumerate(self.entries):
+                    if other != index:
+                        result += assigned_to(domains, variables, 1 << antenna, variable)
+        return result
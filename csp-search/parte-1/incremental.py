@@ -0,0 +1,320 @@
+"""
+Incremental solving of the antenna assignment problem when the operators change it during the day: antennas are
+added to or removed from the slots and satellites or antennas are added to or removed from the constraints.
+
+IncrementalSolver keeps the input, the last solution and the arc consistent domains of the last model. A change
+that only tightens the problem (restricting a domain or adding a constraint) propagates the cached domains from
+the variables it touches instead of from every variable, and a change that relaxes it keeps the last solution,
+which is still valid. Only the variables whose antenna is broken by the change are searched again, with the
+others fixed to their previous antennas, and the search widens to their neighbours and then to their whole
+components only when that fails.
+"""
+
+import argparse
+import json
+import shlex
+import sys
+
+from components import first_component
+from engine import Solver, build_model, separate_frames
+from global_constraints import is_assigned
+
+# Times the set of repaired variables grows to its neighbours before its whole components are searched
+RINGS = 2
+
+CONSTRAINTS = ("constraint_2", "constraint_3", "constraint_4", "constraint_5")
+
+
+class IncrementalSolver:
+    """
+    Long lived solver of the "data" and "constraints" parts of an input JSON that are changed between calls to
+    resolve. The changes are stored in data and constraints, so the model can always be built again from them.
+
+    The counters repaired (variables searched by the last resolve) and the nodes of solver are kept for the
+    statistics.
+    """
+    def __init__(self, data, constraints):
+        self.data = {satellite: {slot: list(antennas) for slot, antennas in slots.items()} for satellite, slots in data.items()}
+        self.constraints = {name: list(constraints.get(name, [])) for name in CONSTRAINTS}
+        self.model = None
+        self.solver = None
+        # Arc consistent domains of the model, None if it has no solution
+        self.domains = None
+        # Last solution as a dictionary from slot names to antennas, None if there is none
+        self.solution = None
+        self.repaired = 0
+        # Names of the slots touched by the changes since the last resolve, whose previous antennas are checked
+        self._touched = set()
+        # Names of the slots whose constraints changed, the propagation starts from them
+        self._scope = set()
+        self._rebuild = True
+        self._relaxed = True
+
+    def _names(self, satellite):
+        return [satellite + " " + slot for slot in self.data.get(satellite, {})]
+
+    def _slot(self, satellite, slot):
+        if slot not in self.data.get(satellite, {}):
+            raise KeyError("Unknown slot {} {}".format(satellite, slot))
+        return self.data[satellite][slot]
+
+    def restrict_domain(self, satellite, slot, antennas):
+        """
+        Removes from the domain of a slot the antennas that are not in antennas
+        """
+        antennas = set(antennas)
+        domain = self._slot(satellite, slot)
+        domain[:] = [antenna for antenna in domain if antenna in antennas]
+        name = satellite + " " + slot
+        self._touched.add(name)
+        self._scope.add(name)
+        if not self._rebuild:
+            # The model is restricted in place, its antenna IDs do not change
+            allowed = 0
+            for antenna in domain:
+                allowed |= 1 << self.model.antenna_ids[antenna]
+            self.model.domains[self.model.variable_ids[name]] &= allowed
+
+    def extend_domain(self, satellite, slot, antennas):
+        """
+        Adds antennas to the domain of a slot
+        """
+        domain = self._slot(satellite, slot)
+        domain += [antenna for antenna in antennas if antenna not in domain]
+        self._rebuild = self._relaxed = True
+
+    def add_constraint(self, name, value):
+        """
+        Adds an element to one of the constraints of the JSON: a satellite to constraint_2 or constraint_3, a
+        [satellite, antenna] pair to constraint_4 or an antenna to constraint_5
+        """
+        if name not in CONSTRAINTS:
+            raise ValueError("Unknown constraint {}".format(name))
+        self.constraints[name].append(value)
+        self._rebuild = True
+        if name == "constraint_2":
+            # The slots of the satellite are merged into one variable, so the variables are numbered again
+            self._relaxed = True
+            self._touched.update(self._names(value))
+        elif name == "constraint_3":
+            self._touched.update(self._names(value))
+            for satellite in self.constraints[name]:
+                self._scope.update(self._names(satellite))
+        elif name == "constraint_4":
+            self._touched.update(self._names(value[0]))
+            for satellite, _ in self.constraints[name]:
+                self._scope.update(self._names(satellite))
+        else:
+            before_noon, after_noon = separate_frames(self.data)
+            for slot in before_noon + after_noon:
+                satellite, slot_name = slot.rsplit(" ", 1)
+                if value in self.data[satellite][slot_name]:
+                    self._touched.add(slot)
+            self._scope.update(before_noon + after_noon)
+
+    def remove_constraint(self, name, value):
+        """
+        Removes one occurrence of an element from one of the constraints of the JSON, see add_constraint
+        """
+        if name not in CONSTRAINTS:
+            raise ValueError("Unknown constraint {}".format(name))
+        if value not in self.constraints[name]:
+            raise ValueError("{} is not in {}".format(value, name))
+        self.constraints[name].remove(value)
+        self._rebuild = self._relaxed = True
+
+    def _build(self):
+        """
+        Builds the model again from the input. The cached domains are kept if the variables and the antennas
+        are numbered as before.
+        """
+        previous = self.model
+        self.model = build_model(self.data, self.constraints)
+        self.solver = Solver(self.model)
+        if previous is None or previous.names != self.model.names or previous.antennas != self.model.antennas:
+            self._relaxed = True
+        self._rebuild = False
+
+    def _propagate(self):
+        """
+        Makes the cached domains arc consistent with the model. After a relaxation they are computed again from
+        the domains of the model, otherwise the propagation starts from the variables of the changed constraints.
+        """
+        if self._relaxed:
+            self.domains = self.solver.initial_domains()
+        elif self.domains is not None:
+            domains = [cached & domain for cached, domain in zip(self.domains, self.model.domains)]
+            queue = sorted({self.model.variable_ids[name] for name in self._scope})
+            if all(domains) and self.solver.propagate(domains, queue):
+                self.domains = domains
+            else:
+                self.domains = None
+
+    def _previous(self):
+        """
+        Returns the antennas of the last solution as a list with one bitset per variable, 0 for the variables
+        whose slots had different antennas or whose antenna is no longer allowed
+        """
+        values = [None] * len(self.model.variables)
+        for name, variable in self.model.names:
+            antenna = self.model.antenna_ids.get(self.solution.get(name))
+            value = 0 if antenna is None else 1 << antenna
+            values[variable] = value if values[variable] in (None, value) else 0
+        return [value & domain for value, domain in zip(values, self.domains)]
+
+    def _broken(self, values):
+        """
+        Returns the set of variables without a previous antenna or whose antenna breaks a constraint with another
+        variable, looking only at the constraints of the touched slots
+        """
+        broken = {variable for variable, value in enumerate(values) if not value}
+        for name in self._touched:
+            variable = self.model.variable_ids.get(name)
+            if variable is None or not values[variable]:
+                continue
+            antenna = values[variable].bit_length() - 1
+            for other, table in self.model.arcs[variable].items():
+                if values[other] and not table[antenna] & values[other]:
+                    broken.update((variable, other))
+            for constraint in self.model.watchers[variable]:
+                others = constraint.conflicts(values, variable)
+                if others:
+                    broken.add(variable)
+                    broken.update(others)
+        return broken
+
+    def _neighbours(self, variables):
+        """
+        Returns the variables constrained together with variables that can still take more than one antenna
+        """
+        free = {variable for variable, domain in enumerate(self.domains) if not is_assigned(domain)}
+        result = set(variables)
+        constraints = {}
+        for variable in variables:
+            result.update(other for other in self.model.arcs[variable] if other in free)
+            for constraint in self.model.watchers[variable]:
+                constraints[id(constraint)] = constraint
+        for constraint in constraints.values():
+            for linked in constraint.links(self.domains, free):
+                if not result.isdisjoint(linked):
+                    result.update(linked)
+        return result
+
+    def _repair(self, variables, values):
+        """
+        Searches an assignment of variables with every other variable fixed to its value.
+
+        *Returns:
+        - the singleton domains of the solution or None if there is none
+        """
+        domains = [domain if variable in variables else value
+                   for variable, (domain, value) in enumerate(zip(self.domains, values))]
+        # The fixed variables are checked when a repaired variable is assigned, the ones assigned already now
+        if not self.solver.propagate(domains, [variable for variable in variables if is_assigned(domains[variable])]):
+            return None
+        return next(self.solver.search(domains, sorted(variables)), None)
+
+    def _solve_components(self, variables, values):
+        """
+        Searches the whole components of variables with the other components fixed to their values. The
+        components are independent, so if one has no solution neither has the problem.
+        """
+        domains = list(values)
+        for variable in variables:
+            if is_assigned(self.domains[variable]):
+                domains[variable] = self.domains[variable]
+        components = self.solver.components(self.domains, range(len(self.domains)))
+        for component in components:
+            if not variables.isdisjoint(component):
+                assignment = first_component(self.solver, self.domains, component)
+                if assignment is None:
+                    return None, 0
+                for variable, domain in assignment:
+                    domains[variable] = domain
+        return domains, sum(len(component) for component in components if not variables.isdisjoint(component))
+
+    def resolve(self):
+        """
+        Applies the changes since the last call and returns a solution as a dictionary from slot names to
+        antennas, as close to the previous one as the changes allow, or None if there is none
+        """
+        if self._rebuild:
+            self._build()
+        self._propagate()
+        self.repaired = 0
+        if self.domains is None:
+            self.solution = None
+        elif self.solution is None:
+            # Without a previous solution every variable is broken
+            broken = set(range(len(self.domains)))
+            domains, self.repaired = self._solve_components(broken, list(self.domains))
+            self.solution = None if domains is None else self.model.solution(domains)
+        else:
+            values = self._previous()
+            broken = self._broken(values)
+            variables = broken
+            domains = None
+            for _ in range(RINGS if broken else 0):
+                domains = self._repair(variables, values)
+                if domains is not None:
+                    self.repaired = len(variables)
+                    break
+                variables = self._neighbours(variables)
+            if broken and domains is None:
+                domains, self.repaired = self._solve_components(variables, values)
+            elif not broken:
+                domains = values
+            self.solution = None if domains is None else self.model.solution(domains)
+        self._touched.clear()
+        self._scope.clear()
+        self._relaxed = False
+        return self.solution
+
+
+def apply(solver, command):
+    """
+    Applies a change written as a line of words:
+    - restrict <satellite> <slot> <antennas...>
+    - extend <satellite> <slot> <antennas...>
+    - add|remove constraint_2|constraint_3 <satellite>
+    - add|remove constraint_4 <satellite> <antenna>
+    - add|remove constraint_5 <antenna>
+    """
+    words = shlex.split(command)
+    if words[0] in ("restrict", "extend"):
+        method = solver.restrict_domain if words[0] == "restrict" else solver.extend_domain
+        method(words[1], words[2], words[3:])
+    elif words[0] in ("add", "remove"):
+        method = solver.add_constraint if words[0] == "add" else solver.remove_constraint
+        method(words[1], words[2:] if words[1] == "constraint_4" else words[2])
+    else:
+        raise ValueError("Unknown change {}".format(words[0]))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''Solves the problem of a JSON file and then reads changes from the standard input, one per line,
+        printing after each one a solution as a JSON line that keeps as many antennas of the previous one as possible,
+        or null if there is none. The changes are "restrict SAT slot antennas...", "extend SAT slot antennas...",
+        "add constraint_N values..." and "remove constraint_N values...".''',
+        epilog="""An example "echo 'add constraint_3 SAT1' | python incremental.py tests/test2.json" """
+    )
+    parser.add_argument('file', help='JSON file with the data and the constraints')
+    args = parser.parse_args()
+
+    with open(args.file) as json_file:
+        file = json.load(json_file)
+    solver = IncrementalSolver(file["data"], file["constraints"])
+    print(json.dumps(solver.resolve()))
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            apply(solver, line)
+        except (KeyError, ValueError, IndexError) as error:
+            print("# invalid change: {}".format(error), file=sys.stderr)
+            continue
+        print(json.dumps(solver.resolve()))
+        print("# repaired variables: {}".format(solver.repaired), file=sys.stderr)
+    sys.exit(0)
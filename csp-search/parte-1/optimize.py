@@ -0,0 +1,197 @@
+"""
+Optimization mode of the antenna assignment problem: instead of any solution, the solution that minimizes an
+objective, found by depth first branch and bound over the same arc consistent search as engine.py.
+
+Objectives are classes registered by name in OBJECTIVES. They are built from the Model and have:
+- cost(domains): cost of a solution given as singleton domains
+- bound(domains): lower bound of the cost of every solution that the domains still allow, computed from the
+  domains only. Branches whose bound is not lower than the cost of the best solution are pruned
+- order(domains, variable): single antenna bitsets of the domain of variable in the order they are tried, the
+  most promising first so that good solutions, and tighter pruning, come early
+"""
+
+import time
+
+from components import first_component
+from engine import Solver, values
+from global_constraints import AllDifferentGroups
+
+# Registry of the objectives by name
+OBJECTIVES = {}
+
+
+def register(name):
+    """
+    Decorator that adds an objective class to the registry
+    """
+    def decorator(objective):
+        OBJECTIVES[name] = objective
+        return objective
+    return decorator
+
+
+def singletons(domain):
+    """
+    Returns the single antenna bitsets of a domain in ascending order
+    """
+    return [1 << antenna for antenna in values(domain)]
+
+
+@register("antennas")
+class DistinctAntennas:
+    """
+    Number of distinct antennas used by the solution.
+
+    The bound adds to the antennas already taken by the assigned variables a set of unassigned variables that
+    cannot take any of them and whose domains are pairwise disjoint, so each one needs a new antenna. The groups
+    of constraint_3 take different antennas, so there are at least as many antennas as groups.
+    """
+    def __init__(self, model):
+        self.groups = max([len(constraint.groups) for constraint in model.constraints
+                           if isinstance(constraint, AllDifferentGroups)], default=0)
+
+    def cost(self, domains):
+        used = 0
+        for domain in domains:
+            used |= domain
+        return used.bit_count()
+
+    def bound(self, domains):
+        used = 0
+        for domain in domains:
+            if not domain & (domain - 1):
+                used |= domain
+        uncovered = sorted((domain for domain in domains if not domain & used), key=int.bit_count)
+        taken = 0
+        disjoint = 0
+        for domain in uncovered:
+            if not domain & taken:
+                taken |= domain
+                disjoint += 1
+        return max(used.bit_count() + disjoint, self.groups)
+
+    def order(self, domains, variable):
+        used = 0
+        for domain in domains:
+            if not domain & (domain - 1):
+                used |= domain
+        domain = domains[variable]
+        return singletons(domain & used) + singletons(domain & ~used)
+
+
+@register("switches")
+class Switches:
+    """
+    Number of times a satellite changes its antenna between two consecutive slots, ordered by their start time,
+    added up over every satellite. Two consecutive slots whose domains do not share an antenna always switch.
+    """
+    def __init__(self, model):
+        slots = {}
+        for name, variable in model.names:
+            satellite, slot = name.rsplit(" ", 1)
+            slots.setdefault(satellite, []).append((int(slot.split("-")[0]), variable))
+        # Pairs of variables of consecutive slots, slots merged into the same variable never switch
+        self.pairs = []
+        self.neighbours = [[] for _ in model.variables]
+        for satellite_slots in slots.values():
+            satellite_slots.sort()
+            for (_, x), (_, y) in zip(satellite_slots, satellite_slots[1:]):
+                if x != y:
+                    self.pairs.append((x, y))
+                    self.neighbours[x].append(y)
+                    self.neighbours[y].append(x)
+
+    def cost(self, domains):
+        return sum(domains[x] != domains[y] for x, y in self.pairs)
+
+    def bound(self, domains):
+        return sum(not domains[x] & domains[y] for x, y in self.pairs)
+
+    def order(self, domains, variable):
+        # The antennas of the assigned neighbouring slots first, the ones shared with more neighbours before
+        domain = domains[variable]
+        shared = {}
+        for neighbour in self.neighbours[variable]:
+            other = domains[neighbour]
+            if other & domain and not other & (other - 1):
+                shared[other] = shared.get(other, 0) + 1
+        preferred = sorted(shared, key=lambda antenna: (-shared[antenna], antenna))
+        rest = 0
+        for antenna in preferred:
+            rest |= antenna
+        return preferred + singletons(domain & ~rest)
+
+
+class OptimizationResult:
+    """
+    Result of the optimization.
+    - solution: the best solution found as a dictionary from slot names to antennas, None if there is none
+    - cost: cost of the best solution
+    - status: "optimal" when the search finished, "unsatisfiable" when it finished without solutions, or
+      "time limit" when it was stopped, keeping the best solution found so far
+    - nodes: assignments tried
+    - revisions: arcs revised and global constraints propagated
+    """
+    def __init__(self, solution, cost, status, nodes, revisions):
+        self.solution = solution
+        self.cost = cost
+        self.status = status
+        self.nodes = nodes
+        self.revisions = revisions
+
+
+def optimize(model, objective, time_limit=None):
+    """
+    Finds the solution of model that minimizes the objective registered with that name, by depth first branch and
+    bound with the variable ordering of Solver and the value ordering of the objective, starting from the first
+    solution of the components. time_limit is in seconds of wall clock, None to search until the best solution is
+    proven optimal.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError("Unknown objective {}, choose one of: {}".format(objective, ", ".join(sorted(OBJECTIVES))))
+    objective = OBJECTIVES[objective](model)
+    solver = Solver(model)
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    domains = solver.initial_domains()
+    if domains is None:
+        return OptimizationResult(None, None, "unsatisfiable", 0, solver.revisions)
+
+    # The first solution of every independent component is the first incumbent, so there is a solution to
+    # return at the time limit and the bound prunes from the start
+    best = list(domains)
+    for component in solver.components(domains, range(len(domains))):
+        assignment = first_component(solver, domains, component)
+        if assignment is None:
+            return OptimizationResult(None, None, "unsatisfiable", solver.nodes, solver.revisions)
+        for variable, domain in assignment:
+            best[variable] = domain
+    best_cost = objective.cost(best)
+    root_bound = objective.bound(domains)
+    status = None
+    variable = solver.select(domains)
+    stack = [] if variable is None or best_cost <= root_bound else [(domains, objective.order(domains, variable), 0, variable)]
+    while stack:
+        if deadline is not None and time.monotonic() > deadline:
+            status = "time limit"
+            break
+        domains, antennas, index, variable = stack.pop()
+        if index == len(antennas):
+            continue
+        stack.append((domains, antennas, index + 1, variable))
+        solver.nodes += 1
+        child = list(domains)
+        child[variable] = antennas[index]
+        if not solver.propagate(child, [variable]):
+            continue
+        if objective.bound(child) >= best_cost:
+            continue
+        next_variable = solver.select(child)
+        if next_variable is None:
+            best, best_cost = child, objective.cost(child)
+            if best_cost <= root_bound:
+                # No solution can be better than the bound of the whole problem
+                break
+        else:
+            stack.append((child, objective.order(child, next_variable), 0, next_variable))
+
+    return OptimizationResult(model.solution(best), best_cost, status or "optimal", solver.nodes, solver.revisions)
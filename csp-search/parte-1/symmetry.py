@@ -0,0 +1,123 @@
+import itertools
+from math import perm
+
+from engine import Solver
+
+
+def interchangeable_antennas(model, domains):
+    """
+    Returns the classes of interchangeable antennas as a list of bitsets, only the classes with two or more antennas.
+
+    Two antennas are interchangeable if they are in the domains of exactly the same variables and no constraint
+    treats them differently: equal and not equal constraints, and the groups of constraint_3, do not depend on
+    the antennas, but the antennas of constraint_4 and constraint_5 and of any other binary table are kept apart.
+    Swapping two interchangeable antennas in a solution gives another solution. domains should be arc
+    consistent, so an antenna taken by a variable with a single antenna left is never interchangeable.
+    """
+    treated_apart = 0
+    for constraint in model.constraints:
+        treated_apart |= constraint.antennas
+    for arcs in model.arcs:
+        for table in arcs.values():
+            if table is not model._equal and table is not model._not_equal:
+                for antenna, compatible in enumerate(table):
+                    if compatible != model.all_antennas:
+                        treated_apart |= 1 << antenna | model.all_antennas ^ compatible
+
+    variables_of = {}
+    for variable, domain in enumerate(domains):
+        domain &= ~treated_apart
+        while domain:
+            low = domain & -domain
+            variables_of.setdefault(low, []).append(variable)
+            domain ^= low
+    classes = {}
+    for antenna, variables in variables_of.items():
+        key = tuple(variables)
+        classes[key] = classes.get(key, 0) | antenna
+    return [antennas for antennas in classes.values() if antennas & (antennas - 1)]
+
+
+def bits(bitset):
+    """
+    Returns the list of the single bit bitsets of bitset in ascending order
+    """
+    result = []
+    while bitset:
+        low = bitset & -bitset
+        result.append(low)
+        bitset ^= low
+    return result
+
+
+class SymmetricSolver(Solver):
+    """
+    Solver that only searches one assignment of every class of symmetric solutions, given the classes of
+    interchangeable antennas.
+
+    When a variable is branched, the antennas of a class that no assigned variable takes yet are all equivalent,
+    so only the lowest one is tried together with the antennas of the class already taken. Every solution found
+    is the representative of the solutions that replace the antennas of each class it uses by any other
+    distinct antennas of the same class, which are generated by expand and counted by multiplicity.
+    """
+    def __init__(self, model, classes):
+        super().__init__(model)
+        self.classes = classes
+        self.symmetric = 0
+        for antennas in classes:
+            self.symmetric |= antennas
+
+    def branch(self, domains, variable, variables=None):
+        domain = domains[variable]
+        if not domain & self.symmetric:
+            return domain
+        used = 0
+        for other in range(len(domains)) if variables is None else variables:
+            if not domains[other] & (domains[other] - 1):
+                used |= domains[other]
+        result = domain & ~self.symmetric
+        for antennas in self.classes:
+            result |= domain & antennas & used
+            unused = domain & antennas & ~used
+            result |= unused & -unused
+        return result
+
+    def multiplicity(self, assignment):
+        """
+        Number of solutions represented by an assignment given as a list of (variable, domain) pairs
+        """
+        used = 0
+        for _, domain in assignment:
+            used |= domain
+        total = 1
+        for antennas in self.classes:
+            total *= perm(antennas.bit_count(), (used & antennas).bit_count())
+        return total
+
+    def expand(self, assignment):
+        """
+        Generator of every solution represented by an assignment, as lists of (variable, domain) pairs. The
+        antennas used from each class are replaced by every sequence of distinct antennas of the class.
+        """
+        used = 0
+        for _, domain in assignment:
+            used |= domain
+        replaced = []
+        for antennas in self.classes:
+            if used & antennas:
+                replaced.append((bits(used & antennas), bits(antennas)))
+        choices = [itertools.permutations(members, len(taken)) for taken, members in replaced]
+        for images in itertools.product(*choices):
+            mapping = {}
+            for (taken, _), image in zip(replaced, images):
+                mapping.update(zip(taken, image))
+            yield [(variable, mapping.get(domain, domain)) for variable, domain in assignment]
+
+    def count_symmetric(self, domains, variables):
+        """
+        Number of assignments of the variables of a component, adding up the multiplicities of its representatives
+        """
+        total = 0
+        for solution in self.search(domains, variables):
+            total += self.multiplicity([(variable, solution[variable]) for variable in variables])
+        return total
@@ -1,82 +1,14 @@
-from queue import PriorityQueue
-from dataclasses import dataclass, field
-from typing import Any
 import time
+import state
 from state import Satellite, Object, State_t
+from search import ALGORITHMS, Budget, SearchOptions, solve
+from portfolio import run_portfolio
+from instrumentation import SearchStats, profiled
 import argparse
 import sys, io
 import re
 
 
-def BFS(initial_state):
-    """
-    Implementation of Breath first search algorithm
-    """
-    open = []
-    closed = set()
-    if(initial_state.is_goal()):
-        return initial_state
-    open.append(initial_state)
-    while(len(open)>0):
-        node = open.pop(0)
-        children = node.children()
-        closed.add(node)
-        
-        for child in children:
-            if child.is_goal():
-                return child
-            if child not in closed:
-                open.append(child)
-            
-    
-def A_star(intitial_state):
-    """
-    Implementation of A_star algorithm
-    
-    *Parameters:
-    - Initial state of the problem
-    
-    *Returns:
-    - Final state of the problem
-    - Number of nodes expanded to reach the solution
-
-    """
-
-    # Priority queue with the ordered nodes to expand
-    open = PriorityQueue()
-
-    # Set that stores expanded nodes
-    closed = set()
-
-    # Counter for the number of expansions
-    expansions = 0
-
-    # Introducing the initial state of the problem with the funcion of the node
-    open.put((initial_state.f(),initial_state))
-    while(not open.empty()):
-
-        # We get the node with the lowest value of f()
-        node = open.get()[1]
-        
-        #If the node to be expanded is a goal, we return it
-        if node.is_goal():
-            return node,expansions
-        
-        # Obtaining a list of counters
-        children = node.children()
-
-        # Update the expandion counter
-        expansions+=1
-        
-        # Adding the node to closed
-        closed.add(node)
-        
-        # Adding the children to open if they are not already expanded (in closed)
-        for child in children:
-            if child not in closed:
-                open.put((child.f(),child))
-
-
 def extract_data(string, pattern):
     """
     Extracts a list containing the capturing groups of a string given a regular expression
@@ -110,28 +42,18 @@ def extract_data(string, pattern):
 
     
     
-if __name__ == '__main__':
+def read_problem(path):
+    """
+    Reads a problem configuration file
+    *Parameters:
+    - path of the file
 
-    # Help command
-    parser=argparse.ArgumentParser(
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        description='''This program is used to search the best solution in a satellite scenario
-        The initial problem configuration must the following format:
-        
-        "OBS: (0,1);(0,3);(1,3)"
-        "SAT1: 1;1;1;1;1"
-        "SAT2: 1;1;1;1;8"
-        ''',
-        epilog="""An example "./cosmos.sh problema.prob h2" """
-    )
-    parser.add_argument('directory_name', nargs='*', default=[1, 2, 3], help='Insert the file location with the intial problem configuration')
-    parser.add_argument('heuristic', help='For the second argument two heuristics can be chose "h1" or "h2"')
-    
-    # Parsing the arguments of the problem
-    args=parser.parse_args()
-    
+    *Returns:
+    - list of satellites in their initial state
+    - list of objects
+    """
     # Opening the file and splitting it in lines
-    file=open(sys.argv[1],'r')
+    file=open(path,'r')
     lines=file.readlines()
 
     objects = []
@@ -167,27 +89,22 @@ if __name__ == '__main__':
     
     
     file.close()
-    
-    # Creation of the initial state of the problem
-    initial_state = State_t(satellites, objects, None, 0, 0, sys.argv[2])
 
-    # Calculating the solution with A* and measuring the time
-    start = time.time()
-    final_state,expansions = A_star(initial_state)
-    end = time.time()
-    
-    # Printing the statistics of the problem solution
-    sys.stdout = open('problem.prob.statistics', 'w')
-    print("Overall time: {:.2f}\nOverall cost: {}\n# Steps: {}\n# Expansions: {}\n".format(end-start, final_state.get_cost(), final_state.get_steps(), expansions))
-    sys.stdout = sys.__stdout__
-    print("Overall time: {:.2f}\nOverall cost: {}\n# Steps: {}\n# Expansions: {}\n".format(end-start, final_state.get_cost(), final_state.get_steps(), expansions))
-    # Getting into a list the actions taken by each of the nodes
-    number_of_satellites = len(final_state.satellites)
-    actions = []
-    while(final_state.parent is not None):
-        actions.insert(0,final_state.action_taken)
-        final_state = final_state.parent
-    
+    return satellites, objects
+
+
+def format_statistics(elapsed, cost, steps, expansions, generated, reopened):
+    """
+    Returns the text of the statistics of a solution found in elapsed seconds
+    """
+    return "Overall time: {:.2f}\nOverall cost: {}\n# Steps: {}\n# Expansions: {}\n# Generated: {}\n# Reopened: {}\n".format(
+        elapsed, cost, steps, expansions, generated, reopened)
+
+
+def format_plan(actions, number_of_satellites):
+    """
+    Returns the text of a plan, one line per time step with the action of every satellite
+    """
     # Printing the actions taken by each node
     time_step = 0
     string_to_print = ""
@@ -210,10 +127,129 @@ if __name__ == '__main__':
                         string_to_print += "{} ".format(actions[action_index + satellite_index])
                     else:   
                         string_to_print += "{}, ".format(actions[action_index + satellite_index])
+    return string_to_print
+
+
+def write_solution(statistics, plan, statistics_path='problem.prob.statistics', output_path='problema.prob.output', echo=True):
+    """
+    Writes the statistics and the plan of a solution to their files and, if echo is set, to the standard output
+    """
+    with open(statistics_path, 'w') as file:
+        print(statistics, file=file)
+    with open(output_path, 'w') as file:
+        print(plan, file=file)
+    if echo:
+        print(statistics)
+        print(plan)
+
 
-    # Printing solution    
-    stdout_ = sys.stdout
-    sys.stdout = open('problema.prob.output', 'w')
-    print(string_to_print)
-    sys.stdout = sys.__stdout__
-    print(string_to_print)
\ No newline at end of file
+def write_result(result, elapsed, statistics_path='problem.prob.statistics', output_path='problema.prob.output', echo=True):
+    """
+    Writes the statistics and the plan of the SearchResult of a search that took elapsed seconds
+    """
+    final_state = result.state
+    statistics = format_statistics(elapsed, final_state.get_cost(), final_state.get_steps(),
+                                   result.expansions, result.generated, result.reopened)
+    plan = format_plan(result.actions, final_state.problem.num_satellites)
+    write_solution(statistics, plan, statistics_path, output_path, echo)
+
+    
+if __name__ == '__main__':
+
+    # Help command
+    parser=argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description='''This program is used to search the best solution in a satellite scenario
+        The initial problem configuration must the following format:
+        
+        "OBS: (0,1);(0,3);(1,3)"
+        "SAT1: 1;1;1;1;1"
+        "SAT2: 1;1;1;1;8"
+        ''',
+        epilog="""An example "./cosmos.sh problema.prob h2" """
+    )
+    parser.add_argument('directory_name', nargs='*', default=[1, 2, 3], help='Insert the file location with the intial problem configuration')
+    parser.add_argument('heuristic', help='For the second argument three heuristics can be chose "h1", "h2" or "h3" (pattern database)')
+    parser.add_argument('--algorithm', choices=sorted(ALGORITHMS), default='astar', help='Search algorithm used to find the plan (default astar)')
+    parser.add_argument('--weight', type=float, default=1.0, help='Weight w of the heuristic in f = g + w*h for wastar')
+    parser.add_argument('--beam-width', type=int, default=100, help='Number of nodes kept in every layer for beam')
+    parser.add_argument('--tie-breaking', choices=['fifo', 'h'], default='fifo', help='Order of the nodes with the same f: insertion order (default fifo) or lower h first')
+    parser.add_argument('--table-size', type=int, default=1000000, help='Maximum number of entries of the transposition table for idastar')
+    parser.add_argument('--initial-weight', type=float, default=3.0, help='First weight of the heuristic for arastar')
+    parser.add_argument('--weight-step', type=float, default=0.5, help='Decrease of the weight after every plan found by arastar')
+    parser.add_argument('--time-limit', type=float, default=None, help='Seconds after which the search stops, returning the best plan found by anytime algorithms')
+    parser.add_argument('--memory-limit', type=float, default=None, help='Megabytes of peak memory after which the search stops')
+    parser.add_argument('--portfolio', action='store_true', help='Run several algorithms and heuristics in parallel processes and keep the plan of the first admissible configuration to finish, or the cheapest one before the time limit. The heuristic argument is ignored')
+    parser.add_argument('--workers', type=int, default=None, help='Number of processes of the portfolio (default one per configuration up to the number of cores)')
+    parser.add_argument('--instrument', action='store_true', help='Record and print counters, peak sizes, timings, branching factor and f progression of astar and wastar')
+    parser.add_argument('--progress', type=int, default=0, help='Print a progress line every N expansions (implies --instrument)')
+    parser.add_argument('--stats-json', default=None, help='Write the instrumentation to a JSON file (implies --instrument)')
+    parser.add_argument('--profile', choices=['cprofile', 'tracemalloc'], default=None, help='Profile the search phase with cProfile or tracemalloc')
+    parser.add_argument('--check-heuristics', action='store_true', help='Check every incremental heuristic value against its computation from scratch')
+    parser.add_argument('--no-dominance', action='store_true', help='Keep the nodes of astar and wastar dominated by a node with more battery and a cost lower or equal')
+    parser.add_argument('--no-symmetry', action='store_true', help='Tell apart the states that only differ in a permutation of satellites with the same parameters')
+    parser.add_argument('--pdb-cache', default=state.PATTERN_DATABASE_CACHE, help='Directory of the tables of the pattern database of h3, keyed by the parameters of the satellites (default {})'.format(state.PATTERN_DATABASE_CACHE))
+    parser.add_argument('--no-pdb-cache', action='store_true', help='Compute the tables of the pattern database of h3 every time')
+    
+    # Parsing the arguments of the problem
+    args=parser.parse_args()
+    state.CHECK_HEURISTICS = args.check_heuristics
+    state.SYMMETRY = not args.no_symmetry
+    state.PATTERN_DATABASE_CACHE = None if args.no_pdb_cache else args.pdb_cache
+    
+    # Reading the problem and creating its initial state
+    satellites, objects = read_problem(args.directory_name[0])
+    initial_state = State_t(satellites, objects, None, 0, 0, args.heuristic)
+
+    if args.portfolio:
+        start = time.time()
+        winner, results = run_portfolio(initial_state, None, args.time_limit, args.memory_limit, args.workers)
+        elapsed = time.time() - start
+        for result in results:
+            print("{}: {}, cost {}, expansions {}, time {:.2f}".format(
+                result.configuration.name, result.status, result.cost, result.expansions, result.elapsed))
+        if winner is None:
+            print("No configuration of the portfolio found a solution")
+            sys.exit(1)
+        print("Winner configuration: {}\n".format(winner.configuration.name))
+        statistics = format_statistics(elapsed, winner.cost, winner.steps, winner.expansions, winner.generated, winner.reopened)
+        write_solution(statistics, format_plan(winner.actions, len(satellites)))
+        sys.exit(0)
+
+    # Every better plan of the anytime algorithms is reported and written as soon as it is found,
+    # so the files hold the best plan even if the process is stopped
+    def report_plan(result):
+        print("Plan found: cost {}, steps {}, expansions {}, time {:.2f}".format(
+            result.state.get_cost(), result.state.get_steps(), result.expansions, budget.elapsed()))
+        write_result(result, budget.elapsed(), echo=False)
+
+    # Calculating the solution with the chosen algorithm and measuring the time
+    stats = None
+    if args.instrument or args.progress > 0 or args.stats_json is not None:
+        stats = SearchStats(args.progress)
+    budget = Budget(args.time_limit, args.memory_limit)
+    options = SearchOptions(args.weight, args.beam_width, args.tie_breaking, args.table_size,
+                            args.initial_weight, args.weight_step, budget, report_plan, stats, not args.no_dominance)
+    result, profile = profiled(args.profile, solve, args.algorithm, initial_state, options)
+    elapsed = budget.elapsed()
+
+    # Printing and saving the instrumentation and the profile of the search
+    if stats is not None:
+        stats.profile = profile
+        print(stats.report() + "\n")
+        if args.stats_json is not None:
+            stats.write_json(args.stats_json)
+    elif profile is not None:
+        print(profile)
+
+    if result.state is None:
+        if result.status == "unsolvable":
+            print("No solution was found after {} expansions".format(result.expansions))
+        else:
+            print("No solution was found before reaching the {} after {} expansions".format(result.status, result.expansions))
+        sys.exit(1)
+    if result.status != "solved":
+        print("The {} was reached, the best plan found is returned".format(result.status))
+
+    # Printing the statistics and the plan of the solution
+    write_result(result, elapsed)
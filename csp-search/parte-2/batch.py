@@ -0,0 +1,124 @@
+import argparse
+import concurrent.futures
+import csv
+import glob
+import json
+import os
+import sys
+import time
+
+from Cosmos import read_problem, format_statistics, format_plan, write_solution
+from search import ALGORITHMS, Budget, SearchOptions, peak_memory, solve
+from state import State_t
+
+# Columns of the report, one row per instance
+REPORT_FIELDS = ["instance", "status", "time", "cost", "steps", "expansions", "generated", "reopened", "peak_memory"]
+
+
+def find_instances(patterns):
+    """
+    Returns the sorted list of problem files given by a list of directories (every .prob file inside),
+    glob patterns or file paths
+    """
+    instances = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            instances.update(glob.glob(os.path.join(pattern, "*.prob")))
+        else:
+            instances.update(glob.glob(pattern))
+    return sorted(instances)
+
+
+def solve_instance(path, heuristic, algorithm, options, time_limit=None, memory_limit=None):
+    """
+    Solves one problem file and writes its statistics and plan next to it, as <path>.statistics and <path>.output.
+    The time and memory limits apply to the search of this instance alone.
+
+    *Returns:
+    - dictionary with the fields of REPORT_FIELDS for the instance
+    """
+    row = dict.fromkeys(REPORT_FIELDS)
+    row["instance"] = path
+    try:
+        satellites, objects = read_problem(path)
+        initial_state = State_t(satellites, objects, None, 0, 0, heuristic)
+        options.budget = Budget(time_limit, memory_limit)
+        result = solve(algorithm, initial_state, options)
+        elapsed = options.budget.elapsed()
+    except Exception as error:
+        row["status"] = "error: {}".format(error)
+        return row
+
+    row.update(status=result.status, time=round(elapsed, 4), expansions=result.expansions,
+               generated=result.generated, reopened=result.reopened, peak_memory=round(peak_memory(), 1))
+    if result.state is not None:
+        final_state = result.state
+        row.update(cost=final_state.get_cost(), steps=final_state.get_steps())
+        statistics = format_statistics(elapsed, final_state.get_cost(), final_state.get_steps(),
+                                       result.expansions, result.generated, result.reopened)
+        plan = format_plan(result.actions, final_state.problem.num_satellites)
+        write_solution(statistics, plan, path + ".statistics", path + ".output", echo=False)
+    return row
+
+
+def write_report(rows, path):
+    """
+    Writes the rows of the report as CSV if path ends with .csv and as JSON otherwise
+    """
+    with open(path, "w", newline="") as file:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(file, REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, file, indent=4)
+
+
+def run_batch(instances, heuristic, algorithm, options, time_limit=None, memory_limit=None, workers=None, isolate=False):
+    """
+    Solves every instance in a pool of worker processes and returns the report rows in the order of instances.
+    Workers are reused between instances unless isolate is set, in which case every instance runs in a new
+    process and its peak memory is not mixed with the instances solved before by the same worker.
+    """
+    rows = {}
+    pool_options = {"max_tasks_per_child": 1} if isolate else {}
+    with concurrent.futures.ProcessPoolExecutor(workers, **pool_options) as executor:
+        futures = {executor.submit(solve_instance, path, heuristic, algorithm, options, time_limit, memory_limit): path
+                   for path in instances}
+        for future in concurrent.futures.as_completed(futures):
+            row = future.result()
+            rows[futures[future]] = row
+            print("{}: {}, cost {}, time {}".format(row["instance"], row["status"], row["cost"], row["time"]))
+    return [rows[path] for path in instances]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''Solves many satellite problems in parallel. The statistics and the plan of every instance are
+        written next to it as <instance>.statistics and <instance>.output, and a report with one row per instance
+        is written as JSON or CSV.''',
+        epilog="""An example "python batch.py ejemplos h2 --report report.csv" """
+    )
+    parser.add_argument('instances', nargs='+', help='Directories (every .prob file inside), glob patterns or problem files')
+    parser.add_argument('heuristic', help='Heuristic used in every search, "h1", "h2" or "h3"')
+    parser.add_argument('--algorithm', choices=sorted(ALGORITHMS), default='astar', help='Search algorithm used to find the plans (default astar)')
+    parser.add_argument('--weight', type=float, default=1.0, help='Weight w of the heuristic in f = g + w*h for wastar')
+    parser.add_argument('--beam-width', type=int, default=100, help='Number of nodes kept in every layer for beam')
+    parser.add_argument('--time-limit', type=float, default=None, help='Seconds after which the search of an instance stops')
+    parser.add_argument('--memory-limit', type=float, default=None, help='Megabytes of peak memory after which the search of an instance stops')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default the number of cores)')
+    parser.add_argument('--isolate', action='store_true', help='Solve every instance in a new process so the peak memory of each one is measured alone')
+    parser.add_argument('--report', default='report.json', help='Path of the report, CSV if it ends with .csv and JSON otherwise')
+    args = parser.parse_args()
+
+    instances = find_instances(args.instances)
+    if not instances:
+        print("No problem files were found")
+        sys.exit(1)
+
+    options = SearchOptions(args.weight, args.beam_width)
+    start = time.time()
+    rows = run_batch(instances, args.heuristic, args.algorithm, options, args.time_limit, args.memory_limit, args.workers, args.isolate)
+    write_report(rows, args.report)
+    print("{} instances solved in {:.2f} seconds, report written to {}".format(len(rows), time.time() - start, args.report))
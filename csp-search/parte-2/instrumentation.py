@@ -0,0 +1,153 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from collections import Counter
+
+
+class SearchStats:
+    """
+    Instrumentation of a search. When an instance is passed in SearchOptions.stats, the best first searches
+    (astar and wastar) record:
+    - counters of expanded, generated, duplicate (pruned because their state had a path at least as cheap),
+      dominated (pruned because a node with the same state but more battery had a path at least as cheap),
+      reopened and stale (entries of open discarded when popped) nodes
+    - the peak sizes of open and closed
+    - the time spent generating children, evaluating the heuristic, hashing keys in closed and best_g and in
+      the operations of the queue
+    - a histogram of the number of children of every expanded node
+    - the progression of f: the expansion, f value and time every time the f of the expanded nodes increases
+    When progress_every is positive, a progress line is printed every progress_every expansions.
+    """
+    def __init__(self, progress_every=0):
+        self.progress_every = progress_every
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        self.expansions = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.dominated = 0
+        self.reopened = 0
+        self.stale = 0
+        self.peak_open = 0
+        self.peak_closed = 0
+        self.times = {"children": 0.0, "heuristic": 0.0, "hashing": 0.0, "queue": 0.0}
+        self.branching = Counter()
+        self.f_trace = []
+        # Report of the profiler, if the search was profiled
+        self.profile = None
+
+    def timed(self, category, function):
+        """
+        Returns a wrapper of function that adds the time of every call to the category
+        """
+        times = self.times
+        clock = time.perf_counter
+
+        def wrapper(*args):
+            start = clock()
+            result = function(*args)
+            times[category] += clock() - start
+            return result
+        return wrapper
+
+    def expanded(self, f, children, open_size, closed_size):
+        """
+        Records the expansion of a node with value f that generated children successors, with the sizes of
+        open and closed after the expansion
+        """
+        self.expansions += 1
+        self.branching[children] += 1
+        if open_size > self.peak_open:
+            self.peak_open = open_size
+        if closed_size > self.peak_closed:
+            self.peak_closed = closed_size
+        if not self.f_trace or f > self.f_trace[-1][1]:
+            self.f_trace.append((self.expansions, f, time.perf_counter() - self.start))
+        if self.progress_every > 0 and self.expansions % self.progress_every == 0:
+            print("Expansions: {}, generated: {}, open: {}, closed: {}, f: {}, time: {:.2f}".format(
+                self.expansions, self.generated, open_size, closed_size, f, time.perf_counter() - self.start))
+
+    def finish(self):
+        """
+        Stores the total time of the search
+        """
+        self.elapsed = time.perf_counter() - self.start
+
+    def to_dict(self):
+        """
+        Returns the statistics as a dictionary that can be written as JSON
+        """
+        return {
+            "elapsed": self.elapsed,
+            "expansions": self.expansions,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "dominated": self.dominated,
+            "reopened": self.reopened,
+            "stale": self.stale,
+            "peak_open": self.peak_open,
+            "peak_closed": self.peak_closed,
+            "times": self.times,
+            "branching": {str(children): count for children, count in sorted(self.branching.items())},
+            "f_trace": [{"expansions": expansions, "f": f, "time": elapsed} for expansions, f, elapsed in self.f_trace],
+            "profile": self.profile,
+        }
+
+    def write_json(self, path):
+        """
+        Writes the statistics to a JSON file
+        """
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=4)
+
+    def report(self):
+        """
+        Returns a text summary of the statistics
+        """
+        lines = [
+            "# Duplicates pruned: {}".format(self.duplicates),
+            "# Dominated pruned: {}".format(self.dominated),
+            "# Stale entries: {}".format(self.stale),
+            "Peak open: {}".format(self.peak_open),
+            "Peak closed: {}".format(self.peak_closed),
+        ]
+        for category, seconds in self.times.items():
+            lines.append("Time in {}: {:.3f}".format(category, seconds))
+        lines.append("Branching factor: " + ", ".join("{}: {}".format(children, count) for children, count in sorted(self.branching.items())))
+        if self.expansions:
+            average = sum(children * count for children, count in self.branching.items()) / self.expansions
+            lines.append("Average branching factor: {:.2f}".format(average))
+        lines.append("f progression: " + ", ".join("{} at {}".format(f, expansions) for expansions, f, _ in self.f_trace))
+        if self.profile is not None:
+            lines.append(self.profile)
+        return "\n".join(lines)
+
+
+def profiled(kind, function, *args):
+    """
+    Calls function with args under a profiler and returns its result and the text report of the profiler.
+    kind is "cprofile" for the functions with the highest cumulative time or "tracemalloc" for the lines that
+    allocated the most memory and the peak memory traced. Any other value calls function without profiling.
+    """
+    if kind == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        result = function(*args)
+        profiler.disable()
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(25)
+        return result, text.getvalue()
+    if kind == "tracemalloc":
+        tracemalloc.start()
+        result = function(*args)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        lines = ["Peak traced memory: {:.1f} MB".format(peak / (1024 * 1024))]
+        for statistic in snapshot.statistics("lineno")[:15]:
+            lines.append(str(statistic))
+        return result, "\n".join(lines)
+    return function(*args), None
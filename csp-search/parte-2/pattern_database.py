@@ -0,0 +1,234 @@
+"""
+Pattern database of the satellite problem, used by the heuristic h3.
+
+The abstraction keeps a single satellite and a single object and forgets the hours: the object can be measured
+whenever the satellite is at its band or the band below, at any hour. For every abstract state (band, battery,
+phase of the object) the exact minimum energy to measure and downlink the object is computed once by value
+iteration, charging being free. The cost does not depend on which object it is but only on its band, so the table
+of a satellite is indexed by (object band, satellite band), the battery projected out with the minimum.
+Satellites with the same parameters share one table and the tables are cached on disk, keyed by the parameters of
+the satellite and the bands of the table, so problems with the same satellites skip the computation.
+
+The costs of different objects are added where their actions are disjoint: every object needs its own measure and
+downlink, but turns are shared, so only the largest extra cost of the turns of a single object is added.
+
+A table file starts with a header (magic, version, rows, width) followed by the costs as unsigned 32 bit little
+endian integers, UNREACHABLE for the bands from which the satellite can never measure and downlink the object.
+"""
+
+import array
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+
+MAGIC = b"CPDB"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")
+
+# Cost of the abstract states from which the object can never be downlinked
+UNREACHABLE = 0xFFFFFFFF
+
+# Phases of the object in the abstraction
+UNMEASURED = 0
+STACKED = 1
+DOWNLINKED = 2
+
+
+def user_cache_directory(name):
+    """
+    Path of the directory name of Cosmos in the cache of the user, that is $XDG_CACHE_HOME/cosmos/name or
+    ~/.cache/cosmos/name, and the temporary directory in place of the cache on systems without home
+    """
+    base = os.environ.get("XDG_CACHE_HOME")
+    if not base:
+        home = os.path.expanduser("~")
+        base = os.path.join(home, ".cache") if home != "~" else tempfile.gettempdir()
+    return os.path.join(base, "cosmos", name)
+
+
+def abstract_costs(parameters, object_band, width):
+    """
+    Computes the exact minimum energy to measure and downlink an object at object_band with a single satellite,
+    by value iteration over the abstract states (band, battery, phase) with bands 0 to width-1. Moving beyond the
+    last band never helps, as every object is below it.
+
+    *Returns:
+    - list with the cost from every band of the satellite with the object unmeasured, the minimum over the
+      battery, UNREACHABLE when the object cannot be downlinked
+    """
+    battery_recharge, downlink_cost, measurement_cost, turn_cost, max_battery = parameters
+    infinity = float("inf")
+    cost = {}
+    for band in range(width):
+        for battery in range(max_battery + 1):
+            cost[band, battery, UNMEASURED] = infinity
+            cost[band, battery, STACKED] = infinity
+            cost[band, battery, DOWNLINKED] = 0
+
+    changed = True
+    while changed:
+        changed = False
+        for (band, battery, phase), value in cost.items():
+            if phase == DOWNLINKED:
+                continue
+            # Charging costs no energy
+            best = cost[band, min(battery + battery_recharge, max_battery), phase]
+            if battery >= turn_cost:
+                for new_band in (band - 1, band + 1):
+                    if 0 <= new_band < width:
+                        best = min(best, turn_cost + cost[new_band, battery - turn_cost, phase])
+            if phase == UNMEASURED and battery >= measurement_cost and band <= object_band <= band + 1:
+                best = min(best, measurement_cost + cost[band, battery - measurement_cost, STACKED])
+            if phase == STACKED and battery >= downlink_cost:
+                best = min(best, downlink_cost + cost[band, battery - downlink_cost, DOWNLINKED])
+            if best < value:
+                cost[band, battery, phase] = best
+                changed = True
+
+    costs = []
+    for band in range(width):
+        best = min(cost[band, battery, UNMEASURED] for battery in range(max_battery + 1))
+        costs.append(UNREACHABLE if best == infinity else best)
+    return costs
+
+
+def build_table(parameters, rows, width):
+    """
+    Builds the table of a satellite with parameters (battery_recharge, downlink_cost, measurement_cost, turn_cost,
+    max_battery) for objects at bands 0 to rows-1 and satellite bands 0 to width-1
+    """
+    table = array.array("I")
+    for object_band in range(rows):
+        table.extend(abstract_costs(parameters, object_band, width))
+    return table
+
+
+def write_table(table, rows, width, path):
+    """
+    Writes a table to path, replacing the file at once so a reader never sees half a file
+    """
+    data = array.array("I", table)
+    if sys.byteorder != "little":
+        data.byteswap()
+    temporary = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, rows, width))
+        file.write(data.tobytes())
+    os.replace(temporary, path)
+
+
+def load_table(path, rows, width):
+    """
+    Loads a table of rows x width costs written by write_table
+    """
+    with open(path, "rb") as file:
+        content = file.read()
+    magic, version, file_rows, file_width = HEADER.unpack_from(content)
+    if magic != MAGIC or version != VERSION or (file_rows, file_width) != (rows, width):
+        raise ValueError("Not a pattern database of version {} with {}x{} entries".format(VERSION, rows, width))
+    table = array.array("I")
+    table.frombytes(content[HEADER.size:])
+    if len(table) != rows * width:
+        raise ValueError("Truncated pattern database")
+    if sys.byteorder != "little":
+        table.byteswap()
+    return table
+
+
+def table_key(parameters, rows, width):
+    """
+    Key of the cache of a table: the hash of the parameters of the satellite, the bands of the table and the
+    version of the format
+    """
+    return hashlib.sha256(repr((VERSION, tuple(parameters), rows, width)).encode()).hexdigest()
+
+
+def cached_table(parameters, rows, width, cache_directory):
+    """
+    Returns the table of a satellite, loading it from cache_directory if it was computed before. Otherwise it is
+    built and stored in the cache. Without cache_directory it is always built.
+
+    *Returns:
+    - the table
+    - True if it was loaded from the cache
+    """
+    if cache_directory is None:
+        return build_table(parameters, rows, width), False
+    cached = os.path.join(cache_directory, table_key(parameters, rows, width) + ".pdb")
+    if os.path.exists(cached):
+        try:
+            return load_table(cached, rows, width), True
+        except (ValueError, struct.error):
+            # A damaged table is computed again
+            pass
+    table = build_table(parameters, rows, width)
+    os.makedirs(cache_directory, exist_ok=True)
+    write_table(table, rows, width, cached)
+    return table, False
+
+
+class PatternDatabase:
+    """
+    Lower bounds of the energy needed to measure and downlink the objects of a problem, built from the static
+    data of a Problem. The tables are loaded from cache_directory or computed and stored there.
+    - width: bands of the tables, from 0 to one band above every object and initial satellite
+    - tables: table of every satellite, shared by the satellites with the same parameters
+    - base: cost of every object measured and downlinked by its cheapest satellite without turning
+    - hits: number of tables loaded from the cache
+    """
+    def __init__(self, problem, cache_directory=None):
+        self.num_satellites = problem.num_satellites
+        self.object_bands = problem.object_bands
+        self.turn_cost = problem.turn_cost
+        self.rows = problem.max_object_band + 1
+        self.width = max(problem.original_bands + (problem.max_object_band,)) + 2
+        self.hits = 0
+        shared = {}
+        self.tables = []
+        for index in range(problem.num_satellites):
+            parameters = (problem.battery_recharge[index], problem.downlink_cost[index], problem.measurement_cost[index],
+                          problem.turn_cost[index], problem.max_battery[index])
+            if parameters not in shared:
+                shared[parameters], hit = cached_table(parameters, self.rows, self.width, cache_directory)
+                self.hits += hit
+            self.tables.append(shared[parameters])
+        self.base = tuple(min(min(table[band * self.width:(band + 1) * self.width]) for table in self.tables)
+                          for band in self.object_bands)
+
+    def cost(self, satellite, bands, object_index):
+        """
+        Exact cost of the abstraction of satellite at bands measuring and downlinking object object_index alone
+        """
+        width = self.width
+        table = self.tables[satellite]
+        row = self.object_bands[object_index] * width
+        if bands < width:
+            return table[row + max(bands, 0)]
+        # Above the table the satellite first turns down to its last band
+        value = table[row + width - 1]
+        if value == UNREACHABLE:
+            return UNREACHABLE
+        return value + self.turn_cost[satellite] * (bands - width + 1)
+
+    def lower_bound(self, bands, unmeasured):
+        """
+        Lower bound of the energy needed to measure and downlink the objects of the bitmask unmeasured with the
+        satellites at bands: the base costs of the objects plus the largest extra cost of the turns needed by
+        a single object. Returns infinity when an object can no longer be downlinked.
+        """
+        result = 0
+        extra = 0
+        while unmeasured:
+            object_bit = unmeasured & -unmeasured
+            unmeasured ^= object_bit
+            object_index = object_bit.bit_length() - 1
+            best = min(self.cost(satellite, bands[satellite], object_index) for satellite in range(self.num_satellites))
+            if best == UNREACHABLE:
+                return float("inf")
+            base = self.base[object_index]
+            result += base
+            if best - base > extra:
+                extra = best - base
+        return result + extra
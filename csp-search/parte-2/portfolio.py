@@ -0,0 +1,134 @@
+import concurrent.futures
+import copy
+import multiprocessing
+import os
+import pickle
+import time
+
+from search import Budget, SearchOptions, solve
+
+
+class Configuration:
+    """
+    One search of the portfolio: the algorithm, the heuristic and the parameters of SearchOptions that differ from
+    the defaults. optimal marks the configurations whose plan cannot be improved once they finish with status
+    "solved", that is A* with an admissible heuristic (h3). h1 and h2 are not admissible, so their plans are only
+    compared by cost with the rest.
+    """
+    def __init__(self, name, algorithm, heuristic, optimal=False, **options):
+        self.name = name
+        self.algorithm = algorithm
+        self.heuristic = heuristic
+        self.optimal = optimal
+        self.options = options
+
+
+# Configurations run by default, the ones expected to finish first are placed first in case there are less workers
+DEFAULT_PORTFOLIO = [
+    Configuration("astar-h3", "astar", "h3", True),
+    Configuration("astar-h2", "astar", "h2"),
+    Configuration("astar-h1", "astar", "h1"),
+    Configuration("wastar-h2-w2", "wastar", "h2", weight=2.0),
+    Configuration("arastar-h2", "arastar", "h2"),
+    Configuration("arastar-h1", "arastar", "h1"),
+    Configuration("astar-h2-hties", "astar", "h2", tie_breaking="h"),
+    Configuration("astar-h1-hties", "astar", "h1", tie_breaking="h"),
+]
+
+
+class PortfolioResult:
+    """
+    Outcome of one configuration of the portfolio. It only holds plain data so it is cheap to send back from
+    the worker: the plan is the list of actions and cost and steps are None when no plan was found.
+    """
+    def __init__(self, configuration, status, cost, steps, actions, expansions, generated, reopened, elapsed):
+        self.configuration = configuration
+        self.status = status
+        self.cost = cost
+        self.steps = steps
+        self.actions = actions
+        self.expansions = expansions
+        self.generated = generated
+        self.reopened = reopened
+        self.elapsed = elapsed
+
+
+# Initial state of the problem and event that cancels the searches, set in every worker by the pool initializer
+_initial_state = None
+_stop_event = None
+
+
+def _initialize(serialized_state, stop_event):
+    """
+    Initializer of the worker processes, the problem is unpickled once per worker instead of once per search
+    """
+    global _initial_state, _stop_event
+    _initial_state = pickle.loads(serialized_state)
+    _stop_event = stop_event
+
+
+def _run(configuration, deadline, memory_limit):
+    """
+    Runs one configuration in a worker until it finishes, the deadline (time.time() value) passes or it is cancelled
+    """
+    time_limit = None if deadline is None else max(deadline - time.time(), 0)
+    budget = Budget(time_limit, memory_limit, _stop_event)
+    initial_state = copy.copy(_initial_state)
+    initial_state.heuristic = configuration.heuristic
+    result = solve(configuration.algorithm, initial_state, SearchOptions(budget=budget, **configuration.options))
+    if result.state is None:
+        return PortfolioResult(configuration, result.status, None, None, None,
+                               result.expansions, result.generated, result.reopened, budget.elapsed())
+    return PortfolioResult(configuration, result.status, result.state.get_cost(), result.state.get_steps(),
+                           result.actions, result.expansions, result.generated, result.reopened, budget.elapsed())
+
+
+def run_portfolio(initial_state, configurations=None, time_limit=None, memory_limit=None, workers=None):
+    """
+    Runs several configurations in parallel, each one in its own process.
+
+    The initial state is pickled once and sent to every worker when it starts. The portfolio finishes as soon
+    as an optimal configuration (admissible heuristic) solves the problem, and the other searches are cancelled.
+    Otherwise it waits for every configuration or until time_limit seconds have passed, and returns the cheapest
+    plan found, including the best plans of the anytime configurations stopped by the deadline.
+
+    *Returns:
+    - PortfolioResult of the winner configuration or None if no plan was found
+    - list with the PortfolioResult of every configuration that ran
+    """
+    configurations = configurations or DEFAULT_PORTFOLIO
+    workers = workers or min(len(configurations), os.cpu_count() or 1)
+    deadline = None if time_limit is None else time.time() + time_limit
+
+    serialized_state = pickle.dumps(initial_state, pickle.HIGHEST_PROTOCOL)
+    stop_event = multiprocessing.Event()
+
+    results = []
+    winner = None
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=_initialize, initargs=(serialized_state, stop_event)) as executor:
+        pending = {executor.submit(_run, configuration, deadline, memory_limit) for configuration in configurations}
+        while pending and winner is None:
+            timeout = None if deadline is None else max(deadline - time.time(), 0)
+            done, pending = concurrent.futures.wait(pending, timeout, concurrent.futures.FIRST_COMPLETED)
+            # The deadline passed, the running searches stop by themselves and return their best plan
+            if not done:
+                break
+            for future in done:
+                result = future.result()
+                results.append(result)
+                if winner is None and result.status == "solved" and result.configuration.optimal:
+                    winner = result
+
+        # Cancelling the searches that did not start and stopping the running ones
+        stop_event.set()
+        for future in pending:
+            future.cancel()
+        for future in concurrent.futures.as_completed(pending):
+            if not future.cancelled():
+                results.append(future.result())
+
+    if winner is None:
+        solved = [result for result in results if result.cost is not None]
+        if solved:
+            winner = min(solved, key=lambda result: result.cost)
+    return winner, results
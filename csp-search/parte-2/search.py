@@ -0,0 +1,624 @@
+import heapq
+import itertools
+import sys
+import time
+from array import array
+from collections import deque
+
+# The resource module is only available on Unix, without it memory limits are not enforced
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Number of budget checks between two measures of the memory used
+MEMORY_CHECK_PERIOD = 1024
+
+# Number of budget checks between two checks of the stop event
+STOP_CHECK_PERIOD = 256
+
+
+class SearchResult:
+    """
+    Result of a search algorithm.
+    - state: the goal state reached or None if the search space was exhausted
+    - expansions: number of nodes expanded
+    - generated: number of successors generated
+    - reopened: number of expanded nodes that were reached again with a lower cost and put back into open
+    - status: "solved", "unsolvable" when the search space was exhausted, or the limit of the budget that
+      stopped the search ("time limit", "memory limit" or "cancelled"). Anytime algorithms return their best plan with it.
+    - actions: the plan as the list of the texts of the actions from the initial state to the goal, None without goal.
+      By default it is rebuilt from the parents of the goal state
+    """
+    def __init__(self, state, expansions, generated, reopened, status=None, actions=None):
+        self.state = state
+        self.expansions = expansions
+        self.generated = generated
+        self.reopened = reopened
+        if status is None:
+            status = "solved" if state is not None else "unsolvable"
+        self.status = status
+        if actions is None and state is not None:
+            actions = state.plan()
+        self.actions = actions
+
+
+class NodeArena:
+    """
+    Store of the nodes reached by a search in parallel arrays indexed by node number:
+    - parents: number of the node it was generated from, -1 for the initial state
+    - costs: cost g with which the node was reached
+    - actions: code of the action that generated it
+    - closed: 1 once the node has been expanded, 2 if it was dropped from open because another node dominates it
+    States do not need to keep references to their parents, so the search only holds the states of open and
+    every expanded node costs a few bytes. The plan is rebuilt following the parent numbers.
+    """
+    def __init__(self):
+        self.parents = array("q")
+        self.costs = array("d")
+        self.actions = array("q")
+        self.closed = bytearray()
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add(self, parent, cost, action):
+        """
+        Stores a new node and returns its number
+        """
+        self.parents.append(parent)
+        self.costs.append(cost)
+        self.actions.append(action)
+        self.closed.append(0)
+        return len(self.parents) - 1
+
+    def path(self, node):
+        """
+        Returns the list of action codes from the initial state to node
+        """
+        actions = []
+        parents = self.parents
+        while parents[node] != -1:
+            actions.append(self.actions[node])
+            node = parents[node]
+        actions.reverse()
+        return actions
+
+
+def peak_memory():
+    """
+    Returns the peak resident memory of the process in megabytes, or 0 when it cannot be measured
+    """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+class Budget:
+    """
+    Limits of a search: time_limit in seconds of wall clock and memory_limit in megabytes of peak resident memory.
+    None means no limit. The clock starts when the budget is created.
+    stop_event is an optional event (for instance a multiprocessing.Event) that cancels the search when set.
+    """
+    def __init__(self, time_limit=None, memory_limit=None, stop_event=None):
+        self.start = time.monotonic()
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.stop_event = stop_event
+        # Reason why the budget was exhausted
+        self.reason = None
+        self.checks = 0
+
+    def elapsed(self):
+        """
+        Seconds since the budget was created
+        """
+        return time.monotonic() - self.start
+
+    def exhausted(self):
+        """
+        Checks if any of the limits has been exceeded or the search has been cancelled.
+        The memory and the stop event are only checked every MEMORY_CHECK_PERIOD and STOP_CHECK_PERIOD calls.
+        """
+        if self.time_limit is not None and self.elapsed() > self.time_limit:
+            self.reason = "time limit"
+            return True
+        self.checks += 1
+        if self.memory_limit is not None and self.checks % MEMORY_CHECK_PERIOD == 0 and peak_memory() > self.memory_limit:
+            self.reason = "memory limit"
+            return True
+        if self.stop_event is not None and self.checks % STOP_CHECK_PERIOD == 0 and self.stop_event.is_set():
+            self.reason = "cancelled"
+            return True
+        return False
+
+
+class SearchOptions:
+    """
+    Parameters of the search algorithms. Every algorithm only reads the ones it uses.
+    - weight: weight w of the heuristic in f = g + w*h used by weighted A*
+    - beam_width: number of nodes kept in every layer of beam search
+    - tie_breaking: criterion between nodes with the same f, "fifo" (insertion order) or "h" (lower h first).
+      With h1 and h2, which are not admissible, "h" can lead to more expensive plans than the original search
+    - table_size: maximum number of entries of the transposition table of IDA*
+    - initial_weight, weight_step: first weight of anytime repairing A* and how much it decreases after every plan
+    - budget: Budget that stops the search when exhausted, None to search without limits
+    - on_solution: function called by anytime algorithms with a SearchResult every time they find a better plan
+    - stats: SearchStats where astar and wastar record their instrumentation, None to run without it
+    - dominance: whether astar and wastar drop the nodes dominated by another node with the same state except for
+      more battery and a cost lower or equal
+    """
+    def __init__(self, weight=1.0, beam_width=100, tie_breaking="fifo", table_size=1000000,
+                 initial_weight=3.0, weight_step=0.5, budget=None, on_solution=None, stats=None, dominance=True):
+        self.weight = weight
+        self.beam_width = beam_width
+        self.tie_breaking = tie_breaking
+        self.table_size = table_size
+        self.initial_weight = initial_weight
+        self.weight_step = weight_step
+        self.budget = budget
+        self.on_solution = on_solution
+        self.stats = stats
+        self.dominance = dominance
+
+    def exhausted(self):
+        """
+        Checks if the budget of the search, if any, has been exhausted
+        """
+        return self.budget is not None and self.budget.exhausted()
+
+
+# Registry of the search algorithms by name
+ALGORITHMS = {}
+
+
+def register(name):
+    """
+    Decorator that adds a search algorithm to the registry.
+    Algorithms receive the initial state and a SearchOptions and return a SearchResult.
+    """
+    def decorator(algorithm):
+        ALGORITHMS[name] = algorithm
+        return algorithm
+    return decorator
+
+
+def solve(name, initial_state, options=None):
+    """
+    Runs the search algorithm registered as name from the initial state
+    """
+    if name not in ALGORITHMS:
+        raise ValueError("Unknown search algorithm {}, choose one of: {}".format(name, ", ".join(sorted(ALGORITHMS))))
+    return ALGORITHMS[name](initial_state, options or SearchOptions())
+
+
+def best_first(initial_state, weight, options):
+    """
+    Best first search over a binary heap ordered by f = g + weight*h.
+
+    The f, h and g values of every node are computed once, when the node is pushed. Nodes with the same f
+    are expanded in order of insertion, so the search is deterministic. With tie_breaking="h" the nodes with
+    the same f are expanded in order of lower h first and then in order of insertion.
+    Every pushed node is stored in a NodeArena and nodes maps every state key to the number of its cheapest
+    node. open may contain several entries of the same state: the entries that are not the cheapest node of
+    their state are discarded lazily when popped, as well as the entries of nodes that were already expanded.
+    Only the states in open are kept; the plan is rebuilt from the arena when the goal is reached.
+    With options.dominance, fronts maps the part of every state without batteries to the Pareto front of the
+    nodes generated with it, as (batteries, node number) pairs. A child with no more battery in any satellite and
+    no lower cost than a node of its front is dropped, and the nodes of open that the child dominates are dropped
+    from the front and discarded when popped.
+    When options.stats is a SearchStats, the operations of the search are timed and recorded in it.
+
+    *Parameters:
+    - Initial state of the problem
+    - Weight of the heuristic
+    - SearchOptions with the tie breaking criterion between nodes with the same f, the budget and the stats
+
+    *Returns:
+    - SearchResult with the goal state and the statistics of the search
+    """
+    # Counter used to break ties between nodes with the same f and h in order of insertion
+    counter = itertools.count()
+
+    # Whether ties are broken by lower h before insertion order
+    h_ties = options.tie_breaking == "h"
+
+    # Parent, cost and action of every node and the number of the cheapest node of every state key
+    arena = NodeArena()
+    costs = arena.costs
+    closed = arena.closed
+    root = arena.add(-1, initial_state.get_cost(), initial_state.action)
+    nodes = {initial_state.key: root}
+
+    # Pareto fronts of (batteries, node number) by the part of the state without batteries
+    fronts = {}
+    if options.dominance:
+        rest, batteries = initial_state.dominance_key()
+        fronts[rest] = [(batteries, root)]
+
+    # Operations of the search, replaced by timed versions when the search is instrumented
+    stats = options.stats
+    push = heapq.heappush
+    pop = heapq.heappop
+    expand = type(initial_state).children
+    heuristic = type(initial_state).h
+    find_node = nodes.get
+    if stats is not None:
+        push = stats.timed("queue", push)
+        pop = stats.timed("queue", pop)
+        expand = stats.timed("children", expand)
+        heuristic = stats.timed("heuristic", heuristic)
+        find_node = stats.timed("hashing", find_node)
+
+    # Binary heap with entries (f, h or 0, insertion order, node number, state)
+    h = heuristic(initial_state)
+    if weight != 1:
+        h *= weight
+    open = [(initial_state.get_cost() + h, h if h_ties else 0, next(counter), root, initial_state)]
+
+    expansions = 0
+    generated = 0
+    reopened = 0
+    duplicates = 0
+    dominated = 0
+    stale = 0
+    closed_size = 0
+    result = None
+
+    while open:
+        # We get the node with the lowest value of f()
+        f, h, _, number, node = pop(open)
+
+        # Discarding entries superseded by a cheaper path or already expanded
+        if closed[number] or find_node(node.key) != number:
+            stale += 1
+            continue
+
+        #If the node to be expanded is a goal, we return it
+        if node.is_goal():
+            result = SearchResult(node, expansions, generated, reopened, actions=node.plan(arena.path(number)))
+            break
+
+        if options.exhausted():
+            result = SearchResult(None, expansions, generated, reopened, options.budget.reason)
+            break
+
+        closed[number] = 1
+        closed_size += 1
+        expansions += 1
+
+        children = expand(node)
+        for child in children:
+            generated += 1
+            child_g = child.get_cost()
+
+            # Duplicate detection: the state is already in open or closed with a cost at least as good
+            previous = find_node(child.key)
+            if previous is not None and child_g >= costs[previous]:
+                duplicates += 1
+                continue
+
+            if options.dominance:
+                rest, batteries = child.dominance_key()
+                front = fronts.get(rest, ())
+                if any(costs[other] <= child_g and all(map(int.__ge__, other_batteries, batteries))
+                         for other_batteries, other in front):
+                    dominated += 1
+                    continue
+                # The nodes of open dominated by the child will not be expanded
+                kept = []
+                for other_batteries, other in front:
+                    if costs[other] >= child_g and all(map(int.__le__, other_batteries, batteries)):
+                        if not closed[other]:
+                            closed[other] = 2
+                        continue
+                    kept.append((other_batteries, other))
+                kept.append((batteries, len(arena)))
+                fronts[rest] = kept
+
+            # A cheaper path to an expanded state puts it back into open
+            if previous is not None and closed[previous] == 1:
+                closed_size -= 1
+                reopened += 1
+
+            # The path is kept in the arena, so the child does not keep its parent alive
+            child.parent = None
+            child_number = arena.add(number, child_g, child.action)
+            nodes[child.key] = child_number
+            child_h = heuristic(child)
+            if weight != 1:
+                child_h *= weight
+            push(open, (child_g + child_h, child_h if h_ties else 0, next(counter), child_number, child))
+
+        if stats is not None:
+            stats.generated = generated
+            stats.expanded(f, len(children), len(open), closed_size)
+
+    if result is None:
+        result = SearchResult(None, expansions, generated, reopened)
+    if stats is not None:
+        stats.generated = generated
+        stats.duplicates = duplicates
+        stats.dominated = dominated
+        stats.reopened = reopened
+        stats.stale = stale
+        stats.finish()
+    return result
+
+
+@register("astar")
+def astar(initial_state, options=None):
+    """
+    A* search, f = g + h
+    """
+    options = options or SearchOptions()
+    return best_first(initial_state, 1, options)
+
+
+@register("wastar")
+def weighted_astar(initial_state, options=None):
+    """
+    Weighted A* search, f = g + w*h. With an admissible h the cost of the plan is at most w times the optimal one.
+    """
+    options = options or SearchOptions()
+    return best_first(initial_state, options.weight, options)
+
+
+@register("idastar")
+def idastar(initial_state, options=None):
+    """
+    Iterative deepening A*.
+
+    Every iteration is a depth first search that prunes the nodes whose f exceeds the bound; the next bound is
+    the lowest f pruned. The stack of the search only keeps the pending siblings of the current path, so memory
+    grows linearly with the depth of the plan. The keys of the states on the current path are kept in a set, so
+    the search never loops over the zero cost actions. A transposition table, emptied on every iteration and
+    limited to options.table_size entries, stores the lowest cost each state has been reached with so that the
+    states already reached through a cheaper path are not expanded again.
+    """
+    options = options or SearchOptions()
+
+    expansions = 0
+    generated = 0
+    reopened = 0
+
+    bound = initial_state.get_cost() + initial_state.h()
+    while True:
+        # Lowest cost found for every state key in this iteration
+        table = {initial_state.key: initial_state.get_cost()}
+        next_bound = float("inf")
+
+        # Stack of pending nodes with their f value. An entry with f None marks the end of the subtree of its
+        # node, which then leaves the path
+        stack = [(bound, initial_state)]
+        path = set()
+        while stack:
+            f, node = stack.pop()
+            if f is None:
+                path.discard(node.key)
+                continue
+
+            # A cheaper path to the same state was found after this one was pushed
+            if table.get(node.key, node.get_cost()) < node.get_cost():
+                continue
+
+            # Nodes beyond the bound are left for the next iteration
+            if f > bound:
+                next_bound = min(next_bound, f)
+                continue
+
+            if node.is_goal():
+                return SearchResult(node, expansions, generated, reopened)
+
+            if options.exhausted():
+                return SearchResult(None, expansions, generated, reopened, options.budget.reason)
+
+            expansions += 1
+            path.add(node.key)
+            stack.append((None, node))
+            children = []
+            for child in node.children():
+                generated += 1
+                # States on the current path close a cycle
+                if child.key in path:
+                    continue
+                child_g = child.get_cost()
+                previous_g = table.get(child.key)
+                if previous_g is not None:
+                    if child_g >= previous_g:
+                        continue
+                    reopened += 1
+                if previous_g is not None or len(table) < options.table_size:
+                    table[child.key] = child_g
+                children.append((child_g + child.h(), child))
+
+            # Pushing the children reversed so they are expanded in the order they were generated
+            stack.extend(reversed(children))
+
+        # The search space is exhausted without a goal
+        if next_bound == float("inf"):
+            return SearchResult(None, expansions, generated, reopened)
+        bound = next_bound
+
+
+@register("beam")
+def beam_search(initial_state, options=None):
+    """
+    Beam search.
+
+    The search advances layer by layer and only the options.beam_width nodes with the lowest f of every layer
+    are expanded, ties broken as in A*. Memory is bounded by the width of the beam and the set of expanded
+    states, but the plan is not guaranteed to be optimal and the search may fail when the beam prunes every
+    path to a goal.
+    """
+    options = options or SearchOptions()
+    h_ties = options.tie_breaking == "h"
+    counter = itertools.count()
+
+    expansions = 0
+    generated = 0
+
+    # Keys of the expanded states
+    closed = set()
+
+    layer = [initial_state]
+    while layer:
+        candidates = {}
+        for node in layer:
+            if node.is_goal():
+                return SearchResult(node, expansions, generated, 0)
+            if options.exhausted():
+                return SearchResult(None, expansions, generated, 0, options.budget.reason)
+            closed.add(node.key)
+            expansions += 1
+            for child in node.children():
+                generated += 1
+                if child.key in closed:
+                    continue
+                # Keeping only the cheapest copy of every state of the next layer
+                previous = candidates.get(child.key)
+                if previous is None or child.get_cost() < previous[3].get_cost():
+                    h = child.h()
+                    candidates[child.key] = (child.get_cost() + h, h if h_ties else 0, next(counter), child)
+        layer = [entry[3] for entry in heapq.nsmallest(options.beam_width, candidates.values())]
+
+    return SearchResult(None, expansions, generated, 0)
+
+
+@register("bfs")
+def breadth_first(initial_state, options=None):
+    """
+    Breadth first search over a deque. It minimises the number of actions, not the energy cost.
+    States are marked as seen when generated, so every state enters open once.
+    """
+    options = options or SearchOptions()
+    expansions = 0
+    generated = 0
+
+    if initial_state.is_goal():
+        return SearchResult(initial_state, expansions, generated, 0)
+
+    open = deque([initial_state])
+    seen = {initial_state.key}
+    while open:
+        node = open.popleft()
+        if options.exhausted():
+            return SearchResult(None, expansions, generated, 0, options.budget.reason)
+        expansions += 1
+        for child in node.children():
+            generated += 1
+            if child.key in seen:
+                continue
+            if child.is_goal():
+                return SearchResult(child, expansions, generated, 0)
+            seen.add(child.key)
+            open.append(child)
+
+    return SearchResult(None, expansions, generated, 0)
+
+
+@register("arastar")
+def anytime_repairing_astar(initial_state, options=None):
+    """
+    Anytime repairing A* (ARA*).
+
+    It runs a weighted A* search starting with options.initial_weight, which finds a first plan quickly, and
+    then repeats it decreasing the weight by options.weight_step down to 1, reusing the work of the previous
+    searches. States whose cost improves after being expanded are not reopened in the same search but kept in
+    an inconsistent list that is added to open for the next weight. A search finishes when no node in open
+    can lead to a plan cheaper than the incumbent. Every better plan is passed to options.on_solution as soon
+    as it is found, and when the budget is exhausted the best plan found so far is returned.
+    """
+    options = options or SearchOptions()
+    h_ties = options.tie_breaking == "h"
+    counter = itertools.count()
+
+    expansions = 0
+    generated = 0
+    reopened = 0
+
+    # Best goal state found
+    incumbent = None
+
+    weight = max(options.initial_weight, 1)
+
+    def entry(node, g):
+        # Heap entry of a node with the current weight, the heuristic is evaluated once per state
+        h = heuristic.get(node.key)
+        if h is None:
+            h = heuristic[node.key] = node.h()
+        weighted_h = h * weight if weight != 1 else h
+        return (g + weighted_h, weighted_h if h_ties else 0, next(counter), g, node)
+
+    # Heuristic value of every generated state
+    heuristic = {}
+    # Lowest cost found for every state key
+    best_g = {initial_state.key: initial_state.get_cost()}
+    open = [entry(initial_state, initial_state.get_cost())]
+    # States improved after being expanded in the current search
+    inconsistent = {}
+
+    while True:
+        # Keys of the states expanded in the current search
+        closed = set()
+        while open:
+            # The incumbent cannot be improved by any node in open
+            if incumbent is not None and open[0][0] >= incumbent.get_cost():
+                break
+
+            f, _, _, g, node = heapq.heappop(open)
+            key = node.key
+            if key in closed or g > best_g[key]:
+                continue
+
+            # Goals are not expanded, they only replace the incumbent when they are cheaper
+            if node.is_goal():
+                if incumbent is None or g < incumbent.get_cost():
+                    incumbent = node
+                    if options.on_solution is not None:
+                        options.on_solution(SearchResult(incumbent, expansions, generated, reopened))
+                continue
+
+            if options.exhausted():
+                return SearchResult(incumbent, expansions, generated, reopened, options.budget.reason)
+
+            closed.add(key)
+            expansions += 1
+
+            for child in node.children():
+                generated += 1
+                child_key = child.key
+                child_g = child.get_cost()
+
+                # Children that cannot improve the incumbent nor the best path to their state are discarded
+                if incumbent is not None and child_g >= incumbent.get_cost():
+                    continue
+                previous_g = best_g.get(child_key)
+                if previous_g is not None and child_g >= previous_g:
+                    continue
+                best_g[child_key] = child_g
+
+                if child_key in closed:
+                    inconsistent[child_key] = child
+                    reopened += 1
+                else:
+                    heapq.heappush(open, entry(child, child_g))
+
+        # The last search was done with the real heuristic or there is nothing left to search
+        if weight == 1 or (not open and not inconsistent):
+            return SearchResult(incumbent, expansions, generated, reopened)
+
+        # Decreasing the weight and rebuilding open with the pending and inconsistent states
+        weight = max(weight - options.weight_step, 1)
+        pending = {}
+        for _, _, _, g, node in open:
+            if g == best_g[node.key]:
+                pending[node.key] = node
+        pending.update(inconsistent)
+        inconsistent = {}
+        open = [entry(node, node.get_cost()) for node in pending.values()]
+        heapq.heapify(open)
@@ -1,5 +1,6 @@
 from collections import deque
-import copy
+
+from pattern_database import PatternDatabase, user_cache_directory
 
 #Definition of the object class
 class Object:
@@ -129,32 +130,371 @@ class Satellite:
         Method to get the current hour of a satellite
         """
         return self.hour % 12
+#Positions of the fields inside the packed tuple that stores the dynamic part of a satellite
+BATTERY = 0
+BANDS = 1
+HOUR = 2
+STACK = 3
+
+#Number of bits of the canonical key used by the hour mod 12 and the bands of each satellite.
+#Bands only change by one with every turn, so they stay far below the limit
+HOUR_BITS = 4
+BANDS_BITS = 16
+
+#When enabled, every incremental heuristic value is checked against the computation from scratch
+CHECK_HEURISTICS = False
+
+#When enabled, satellites with the same parameters are interchangeable and the states that only differ in a
+#permutation of their dynamic data share the same canonical key
+SYMMETRY = True
+
+#Directory where the tables of the pattern database of h3 are cached, None to compute them every time
+PATTERN_DATABASE_CACHE = user_cache_directory("pdb")
+
+#Kinds of action, stored in the lowest ACTION_KIND_BITS bits of the action code of a node. The rest of the code
+#holds the satellite that acted and, for measurements and downlinks, the object
+IDLE, CHARGE, MEASURE, DOWNLINK, TURN_UP, TURN_DOWN = range(6)
+ACTION_KIND_BITS = 3
+ACTION_NAMES = ("IDLE", "Charge", "Measure", "Downlink", "Turn", "Turn")
+
+#Action code of the initial state, which is not reached by any action
+NO_ACTION = -1
+
+#Definition of the problem class
+class Problem:
+    """
+    Static data of a problem instance. It is built once from the initial satellites and objects and
+    shared by every state of the search, so the parameters that never change (costs, maximum battery,
+    recharge, original bands and the position of the objects) are not copied into every node.
+    """
+    def __init__(self, satellites, objects):
+        #Storing the number of satellites and objects of the problem
+        self.num_satellites = len(satellites)
+        self.num_objects = len(objects)
+        #Storing the static parameters of each satellite, indexed by satellite
+        self.battery_recharge = tuple(satellite.battery_recharge for satellite in satellites)
+        self.downlink_cost = tuple(satellite.downlink_cost for satellite in satellites)
+        self.measurement_cost = tuple(satellite.measurement_cost for satellite in satellites)
+        self.turn_cost = tuple(satellite.turn_cost for satellite in satellites)
+        self.max_battery = tuple(satellite.max_battery for satellite in satellites)
+        self.original_bands = tuple(satellite.original_bands for satellite in satellites)
+        #Storing the position of each object, indexed by object
+        self.object_bands = tuple(object.band for object in objects)
+        self.object_hours = tuple(object.hour for object in objects)
+        #Storing the layout of the canonical key of a state. The lowest bits are the measured bitmask and then
+        #every satellite has a block with its battery, bands, hour mod 12 and number of stacked measurements
+        self.battery_bits = max(self.max_battery + (0,)).bit_length()
+        self.bands_bits = BANDS_BITS
+        self.stack_bits = self.num_objects.bit_length()
+        self.satellite_bits = self.battery_bits + self.bands_bits + HOUR_BITS + self.stack_bits
+        self.satellite_shift = tuple(self.num_objects + index * self.satellite_bits for index in range(self.num_satellites))
+        #Storing the mask of the battery bits of every satellite in the key, used to split the key for dominance
+        self.battery_mask = sum(((1 << self.battery_bits) - 1) << shift for shift in self.satellite_shift)
+        #Storing the groups of interchangeable satellites, the ones with the same parameters, and the group of every
+        #satellite. Satellites alone in their group keep their block of the key in place
+        parameters = list(zip(self.battery_recharge, self.downlink_cost, self.measurement_cost, self.turn_cost, self.max_battery))
+        groups = {}
+        for index in range(self.num_satellites):
+            groups.setdefault(parameters[index] if SYMMETRY else index, []).append(index)
+        self.groups = tuple(tuple(group) for group in groups.values())
+        self.group_of = [None] * self.num_satellites
+        for group in self.groups:
+            for index in group:
+                self.group_of[index] = group
+        #Storing for every band x the bitmask of the objects placed at a band lower or equal than x, used to update
+        #the band distance of h1 when a satellite turns. From the last band on it contains every object
+        self.max_object_band = max(self.object_bands + (0,))
+        self.objects_up_to_band = tuple(sum(1 << index for index in range(self.num_objects) if self.object_bands[index] <= band)
+                                        for band in range(self.max_object_band + 1))
+        self.all_objects = (1 << self.num_objects) - 1
+        #Storing for every hour mod 12 and band x the bitmask of the objects a satellite at band x sees at that hour,
+        #which are the ones placed at bands x and x+1 with that hour. Satellites beyond the last band see nothing
+        self.visible = tuple(tuple(sum(1 << index for index in range(self.num_objects)
+                                       if self.object_hours[index] == hour and band <= self.object_bands[index] <= band + 1)
+                                   for band in range(self.max_object_band + 1))
+                             for hour in range(12))
+        #The pattern database of h3 is built the first time it is used
+        self.database = None
+
+    def visible_objects(self, bands, hour):
+        """
+        Returns the bitmask of the objects that a satellite at bands sees at hour, measured or not
+        """
+        if bands < 0 or bands > self.max_object_band:
+            return 0
+        return self.visible[hour % 12][bands]
+
+    def pattern_database(self):
+        """
+        Returns the PatternDatabase of the problem, loading or computing its tables the first time
+        """
+        if self.database is None:
+            self.database = PatternDatabase(self, PATTERN_DATABASE_CACHE)
+        return self.database
+
+    def action_code(self, satellite, kind, object_index=-1):
+        """
+        Returns the integer that encodes an action of kind taken by satellite index satellite on object object_index
+        """
+        return (satellite * (self.num_objects + 1) + object_index + 1) << ACTION_KIND_BITS | kind
+
+    def action_text(self, code):
+        """
+        Returns the text of the action encoded by code as it is written in the plan, like "SAT1: Measure O2"
+        """
+        satellite, object_index = divmod(code >> ACTION_KIND_BITS, self.num_objects + 1)
+        text = "SAT{}: {}".format(satellite + 1, ACTION_NAMES[code & ((1 << ACTION_KIND_BITS) - 1)])
+        if object_index:
+            text += " O{}".format(object_index)
+        return text
+
+    def satellite_block(self, packed):
+        """
+        Returns the block of the canonical key of a satellite with the packed data given, before shifting it to
+        the position of the satellite
+        """
+        block = packed[BATTERY]
+        block |= packed[BANDS] << self.battery_bits
+        block |= (packed[HOUR] % 12) << (self.battery_bits + self.bands_bits)
+        block |= len(packed[STACK]) << (self.battery_bits + self.bands_bits + HOUR_BITS)
+        return block
+
+    def satellite_key(self, index, packed):
+        """
+        Returns the bits of the canonical key that correspond to satellite index with the packed data given
+        """
+        return self.satellite_block(packed) << self.satellite_shift[index]
+
+    def group_key(self, group, sats):
+        """
+        Returns the bits of the canonical key of a group of interchangeable satellites: the blocks of the group
+        sorted from the highest, placed at the positions of the satellites of the group. Permuting the dynamic
+        data of the satellites of a group does not change them.
+        """
+        if len(group) == 1:
+            return self.satellite_key(group[0], sats[group[0]])
+        blocks = sorted((self.satellite_block(sats[index]) for index in group), reverse=True)
+        key = 0
+        for index, block in zip(group, blocks):
+            key |= block << self.satellite_shift[index]
+        return key
+
+    def key(self, sats, measured):
+        """
+        Computes the canonical key of a state from scratch
+        """
+        key = measured
+        for group in self.groups:
+            key |= self.group_key(group, sats)
+        return key
+
+    def split_key(self, key):
+        """
+        Splits a canonical key into the part without batteries and the battery of every block. Inside a group of
+        interchangeable satellites the blocks are sorted by the rest of their fields and then by the battery,
+        from the highest, so two keys with the same rest compare their batteries block by block.
+
+        *Returns:
+        - the key with the battery bits cleared
+        - tuple with the battery of every satellite block of the key
+        """
+        battery_field = (1 << self.battery_bits) - 1
+        return key & ~self.battery_mask, tuple(key >> shift & battery_field for shift in self.satellite_shift)
+
+    def objects_at_most(self, band):
+        """
+        Returns the bitmask of the objects placed at a band lower or equal than band
+        """
+        if band < 0:
+            return 0
+        if band > self.max_object_band:
+            return self.all_objects
+        return self.objects_up_to_band[band]
+
+    def band_distance(self, bands, object_index):
+        """
+        Number of turns a satellite at bands needs to see object object_index, as counted by h1.
+        The satellite sees its band and the next one.
+        """
+        object_band = self.object_bands[object_index]
+        if bands + 1 < object_band:
+            return object_band - 1 - bands
+        if object_band < bands:
+            return bands - object_band
+        return 0
+
+    def turn_distance_delta(self, bands, new_bands, unmeasured):
+        """
+        Change of the band distance of h1 summed over the unmeasured objects when a satellite turns from bands to new_bands.
+        Turning up makes the satellite one band further from the objects below it and one band closer to the objects
+        two bands or more above it. Turning down is the opposite.
+        """
+        if new_bands > bands:
+            return (unmeasured & self.objects_at_most(bands)).bit_count() - (unmeasured & ~self.objects_at_most(bands + 1)).bit_count()
+        return (unmeasured & ~self.objects_at_most(bands)).bit_count() - (unmeasured & self.objects_at_most(bands - 1)).bit_count()
+
+    def satellite(self, index, packed):
+        """
+        Builds a Satellite with the static parameters of satellite index and the dynamic part stored in packed
+        """
+        satellite = Satellite(self.original_bands[index], self.battery_recharge[index], self.downlink_cost[index],
+                              self.measurement_cost[index], self.turn_cost[index], self.max_battery[index], packed[HOUR])
+        satellite.battery = packed[BATTERY]
+        satellite.bands = packed[BANDS]
+        satellite.measurements_stack = list(packed[STACK])
+        return satellite
+
+    def object(self, index, measured):
+        """
+        Builds an Object with the position of object index and the measured state given by the bitmask measured
+        """
+        object = Object(self.object_bands[index], self.object_hours[index])
+        if measured >> index & 1:
+            object.measure()
+        return object
+
+
 #Definition of the state class
 class State_t:
+    """
+    Search node of the satellite problem.
+    The dynamic part of the state is packed and immutable:
+    - sats: a tuple with one (battery, bands, hour, measurements stack) tuple per satellite
+    - measured: a bitmask with bit i set when object i has been measured
+    Both are summarised in key, an integer computed once when the state is created that identifies the state
+    for hashing and equality. Satellites with the same parameters are interchangeable, so the key does not change
+    when their dynamic data is permuted; the data stays with the real satellites and plans name them. The terms of the heuristics that depend on the bands of the satellites are stored too
+    (band_distance for h1 and band_drift for h2) and children update them with the change of the action taken. The static part is stored once in a Problem shared by all the states. The satellites and objects
+    properties rebuild Satellite and Object instances from the packed data; they are snapshots, so
+    modifying them does not modify the state.
+    """
+    __slots__ = ("problem", "sats", "measured", "key", "band_distance", "band_drift", "parent", "cost", "downlinked_objects_counter", "action", "heuristic")
+
     def __init__(self, satellites, objects, parent = None, cost = 0, downlinked_objects_counter=0, heuristic = "h1"):
-        #Storing the list of satellites
-        self.satellites = copy.deepcopy(satellites)
-        #Storing the list of objects
-        self.objects = copy.deepcopy(objects)
+        #Storing the static data of the problem
+        self.problem = Problem(satellites, objects)
+        #Storing the packed dynamic data of every satellite
+        self.sats = tuple((satellite.battery, satellite.bands, satellite.hour, tuple(satellite.measurements_stack)) for satellite in satellites)
+        #Storing the measured state of the objects as a bitmask
+        self.measured = 0
+        for object_index in range(len(objects)):
+            if objects[object_index].measured:
+                self.measured |= 1 << object_index
+        #Storing the canonical key that identifies the state
+        self.key = self.problem.key(self.sats, self.measured)
+        #Storing the terms of the heuristics computed from scratch
+        self.band_distance = self.compute_band_distance()
+        self.band_drift = self.compute_band_drift()
         #Storing the parent from which this node was generated for backtracking purposes
         self.parent = parent
         #Storing the accumulated cost of energy by the actions of all satellites
         self.cost = cost
         #Storing the number of downliked objects
         self.downlinked_objects_counter = downlinked_objects_counter
-        #Storing the operation taken by this state with respect to the parent
-        self.action_taken = ""
+        #Storing the code of the operation taken by this state with respect to the parent
+        self.action = NO_ACTION
         #Storing the heuristic being implemented
         self.heuristic = heuristic
+
+    @property
+    def satellites(self):
+        """
+        List of Satellite instances rebuilt from the packed state
+        """
+        return [self.problem.satellite(index, self.sats[index]) for index in range(self.problem.num_satellites)]
+
+    @property
+    def objects(self):
+        """
+        List of Object instances rebuilt from the measured bitmask
+        """
+        return [self.problem.object(index, self.measured) for index in range(self.problem.num_objects)]
+
+    def child(self, index, satellite, measured, cost, downlinked_objects_counter, action):
+        """
+        Creates a successor of the current state in which only satellite index changes to the packed tuple satellite.
+        The rest of satellites are shared with the current state as they are immutable.
+        """
+        problem = self.problem
+        child = State_t.__new__(State_t)
+        child.problem = problem
+        child.sats = self.sats[:index] + (satellite,) + self.sats[index+1:]
+        child.measured = measured
+        # Only the bits of the measured objects and the group of the changed satellite differ from the key of the parent
+        group = problem.group_of[index]
+        if len(group) == 1:
+            child.key = (self.key ^ self.measured ^ measured
+                         ^ problem.satellite_key(index, self.sats[index]) ^ problem.satellite_key(index, satellite))
+        else:
+            child.key = (self.key ^ self.measured ^ measured
+                         ^ problem.group_key(group, self.sats) ^ problem.group_key(group, child.sats))
+        # Updating the heuristic terms with the change of the satellite that acted
+        bands = self.sats[index][BANDS]
+        new_bands = satellite[BANDS]
+        child.band_distance = self.band_distance
+        child.band_drift = self.band_drift
+        if new_bands != bands:
+            child.band_distance += problem.turn_distance_delta(bands, new_bands, problem.all_objects & ~measured)
+            original_bands = problem.original_bands[index]
+            child.band_drift += abs(new_bands - original_bands) - abs(bands - original_bands)
+        if measured != self.measured:
+            # The measured object no longer counts for the band distance of any satellite
+            object_index = (measured ^ self.measured).bit_length() - 1
+            for packed in child.sats:
+                child.band_distance -= problem.band_distance(packed[BANDS], object_index)
+        child.parent = self
+        child.cost = cost
+        child.downlinked_objects_counter = downlinked_objects_counter
+        child.action = action
+        child.heuristic = self.heuristic
+        return child
+
     #Method to calculate the cost of expanding a node as f=g(cost in energy)+h(heuristic cost)
     def f(self):
         """
         Calculates the addition of the cost function and the heuristic funciton for the current state
         Chooses one heuristic or the other depending of the initial argument given.
         """
+        return self.get_cost() + self.h()
+
+    def h(self):
+        """
+        Returns the value of the heuristic chosen with the initial argument for the current state
+        """
+        problem = self.problem
+        remaining = problem.num_objects - self.downlinked_objects_counter
         if self.heuristic == "h1":
-            return self.get_cost() + self.h1()
-        return self.get_cost() + self.h2()
+            result = self.band_distance / problem.num_satellites + remaining
+        elif self.heuristic == "h3":
+            # Computed from the tables of the pattern database, there is no incremental version to check
+            return self.h3()
+        else:
+            result = remaining + problem.num_objects - self.measured.bit_count() + self.band_drift
+        if CHECK_HEURISTICS:
+            expected = self.h1() if self.heuristic == "h1" else self.h2()
+            if result != expected:
+                raise RuntimeError("Incremental {} is {} but the computation from scratch is {}".format(self.heuristic, result, expected))
+        return result
+
+    def compute_band_distance(self):
+        """
+        Sum over every satellite and unmeasured object of the turns the satellite needs to see the object
+        """
+        result = 0
+        for sat in self.sats:
+            for object_index in range(self.problem.num_objects):
+                if not self.measured >> object_index & 1:
+                    result += self.problem.band_distance(sat[BANDS], object_index)
+        return result
+
+    def compute_band_drift(self):
+        """
+        Sum over every satellite of the bands it has turned from its original bands
+        """
+        result = 0
+        for satellite_index in range(self.problem.num_satellites):
+            result += abs(self.sats[satellite_index][BANDS] - self.problem.original_bands[satellite_index])
+        return result
     #Method to get the accumulated cost of energy
     def get_cost(self):
         """
@@ -167,24 +507,26 @@ class State_t:
         This corresponds to the h1 heuristic defined in the report
         It is based on the differnce in bands of all the satellites with all the objects to know if the
         objects should move. Then, it is divided by the number of satellites to avoid overcounting.
+        It is computed from scratch; the search uses the incremental value returned by h().
         """
         result = 0
-        for sat in self.satellites:
-            for obj in self.objects:
+        object_bands = self.problem.object_bands
+        for sat in self.sats:
+            for object_index in range(self.problem.num_objects):
 
                 # Only add if the object is yet to be measured
-                if(not obj.measured):
+                if(not self.measured >> object_index & 1):
                     # If the object is above the satellite we take into account that the satellite can see one band further
-                    if(sat.bands + 1 < obj.band):
-                        result += obj.band - 1 - sat.bands
+                    if(sat[BANDS] + 1 < object_bands[object_index]):
+                        result += object_bands[object_index] - 1 - sat[BANDS]
                         
                         
                     # If the object is in an inferior band we calculate the distance normally
-                    elif(obj.band  < sat.bands):
-                        result += sat.bands - obj.band
+                    elif(object_bands[object_index]  < sat[BANDS]):
+                        result += sat[BANDS] - object_bands[object_index]
         # Doing an average of the cost for all the satellites to get an estimation
-        result /= len(self.satellites)
-        result += len(self.objects) - self.downlinked_objects_counter
+        result /= self.problem.num_satellites
+        result += self.problem.num_objects - self.downlinked_objects_counter
 
         return result
     
@@ -195,17 +537,29 @@ class State_t:
         Also, it penalizes the turning operation of satellites as, in our inital configuration the satellites cover all the bands.
         We assumed we could do it this way beacuse in the problem is not specified and also the example is given in this way.
         As the objective is to minimize the energy cost, we choose the IDLE operation over the turns. 
+        It is computed from scratch; the search uses the incremental value returned by h().
         """
         result = 0
-        result += len(self.objects) - self.downlinked_objects_counter
+        result += self.problem.num_objects - self.downlinked_objects_counter
         #Penalising the turns as they use up energy
-        for object in self.objects:
-            if(not object.measured):
-                result+=1
-        for satellite in self.satellites:
-            result +=  abs(satellite.bands - satellite.original_bands)
+        result += self.problem.num_objects - self.measured.bit_count()
+        for satellite_index in range(self.problem.num_satellites):
+            result +=  abs(self.sats[satellite_index][BANDS] - self.problem.original_bands[satellite_index])
         return result
-        
+
+    def h3(self):
+        """
+        This heuristic is an admissible lower bound of the energy left, computed from the pattern database of the problem.
+        Every object still stacked needs the downlink of its satellite and every unmeasured object its measure and
+        downlink by the cheapest satellite, plus the turns that the satellites need to reach the object that is
+        the most expensive to reach alone.
+        """
+        problem = self.problem
+        result = 0
+        for satellite_index in range(problem.num_satellites):
+            result += problem.downlink_cost[satellite_index] * len(self.sats[satellite_index][STACK])
+        bands = [sat[BANDS] for sat in self.sats]
+        return result + problem.pattern_database().lower_bound(bands, problem.all_objects & ~self.measured)
 
     def is_goal(self):
         """
@@ -216,9 +570,9 @@ class State_t:
         # As we delayed the satellites, it may happen that with just the first satellite's operation the problem finishes
         # and the other satellites remain delayed. But for printing porpueses and in order to avoid this implementation decision to be
         # reflected on the result, we enforce that all the satellites are synchronized
-        first_satellite_hour = self.satellites[0].hour
-        last_satellite_hour = self.satellites[len(self.satellites)-1].hour
-        return self.downlinked_objects_counter == len(self.objects) and (first_satellite_hour == last_satellite_hour)
+        first_satellite_hour = self.sats[0][HOUR]
+        last_satellite_hour = self.sats[-1][HOUR]
+        return self.downlinked_objects_counter == self.problem.num_objects and (first_satellite_hour == last_satellite_hour)
 
     def increase_cost(self, cost):
         self.cost = self.cost + cost
@@ -229,13 +583,37 @@ class State_t:
         """
         Returns the number of steps taken by the less delayed satellite which is always satellite 0
         """
-        return self.satellites[0].hour
+        return self.sats[0][HOUR]
 
     def save_action(self, action):
         """
-        Saves a string with the action into a the state
+        Saves the code of the action into the state
+        """
+        self.action = action
+
+    @property
+    def action_taken(self):
+        """
+        Text of the action taken by this state with respect to the parent, empty for the initial state
+        """
+        if self.action == NO_ACTION:
+            return ""
+        return self.problem.action_text(self.action)
+
+    def plan(self, actions=None):
+        """
+        Returns the list of actions taken from the initial state to reach this state as text.
+        actions is the list of action codes of the path for the states that do not keep their parents, because
+        the search stores the path in a NodeArena; otherwise the path is followed through the parents.
         """
-        self.action_taken = action
+        if actions is None:
+            actions = []
+            state = self
+            while state.parent is not None:
+                actions.append(state.action)
+                state = state.parent
+            actions.reverse()
+        return [self.problem.action_text(code) for code in actions]
           
 
 
@@ -246,170 +624,84 @@ class State_t:
         #Getting new satellite index to be expanded
         next_index = self.get_next_satellite_index()
 
+        # Packed data of the satellite to be expanded and its static parameters
+        battery, bands, hour, stack = self.sats[next_index]
+        problem = self.problem
+        max_battery = problem.max_battery[next_index]
+
         #-----------IDLE operation---------------------------------
         
-        if self.satellites[next_index].battery == self.satellites[next_index].max_battery:
-            # Copying current state
-            idle_child = State_t(self.satellites, self.objects, self, self.cost, self.downlinked_objects_counter,self.heuristic)
-                
+        if battery == max_battery:
             # Moving satellite to next hour
-            idle_child.satellites[next_index].next_hour()
-
-            # Save action
-            idle_child.action_taken = "SAT" + str(next_index+1) + ": IDLE"
-
-            children.append(idle_child)
+            children.append(self.child(next_index, (battery, bands, hour + 1, stack), self.measured,
+                                       self.cost, self.downlinked_objects_counter, problem.action_code(next_index, IDLE)))
 
         #----------- CHARGE battery--------------------------------
         
-        if(not self.satellites[next_index].is_battery_full()):
-            recharge_child = State_t(self.satellites, self.objects, self, self.cost, self.downlinked_objects_counter,self.heuristic)
-            
-            # We recharge in the child
-            recharge_child.satellites[next_index].recharge()
-
-            #Moving the satellite to the next hour
-            recharge_child.satellites[next_index].next_hour()
-
-            # Save action
-            recharge_child.action_taken= "SAT"+ str(next_index+1) + ": Charge"
-
-            # Adding to the return vector the new state
-            children.append(recharge_child)
+        else:
+            # We recharge without exceeding the maximum battery and move the satellite to the next hour
+            recharged = min(battery + problem.battery_recharge[next_index], max_battery)
+            children.append(self.child(next_index, (recharged, bands, hour + 1, stack), self.measured,
+                                       self.cost, self.downlinked_objects_counter, problem.action_code(next_index, CHARGE)))
 
         # -------------MEASUREMENTS operation------------
                 
-        # Getting an object that can be measured
-        object_to_measure = self.check_ability_measurement(next_index)
-
-        if(object_to_measure > -1):
-            
-            #Creating a child
-            measure_child = State_t(self.satellites, self.objects, self, self.cost, self.downlinked_objects_counter,self.heuristic)
-            
-            # Measure the object
-            measure_child.objects[object_to_measure].measure()
-
-            # Store the object in the satellite stack
-            measure_child.satellites[next_index].measure(object_to_measure)
-
-            # Increase time
-            measure_child.satellites[next_index].next_hour()
-
-            # Increase cost
-            measure_child.increase_cost(self.satellites[next_index].measurement_cost)
-            
-            # Save action
-            measure_child.action_taken = "SAT"+ str(next_index+1) + ": Measure O" + str(object_to_measure+1)
-            
-            # Appending the new child
-            children.append(measure_child)
+        # Getting every object that can be measured, each one is a different successor
+        measurable = self.check_ability_measurement(next_index)
+
+        measurement_cost = problem.measurement_cost[next_index]
+        while measurable:
+            # Measure the lowest object left, store it in the satellite stack, increase time and cost
+            object_bit = measurable & -measurable
+            measurable ^= object_bit
+            object_to_measure = object_bit.bit_length() - 1
+            children.append(self.child(next_index, (battery - measurement_cost, bands, hour + 1, stack + (object_to_measure,)),
+                                       self.measured | object_bit, self.cost + measurement_cost,
+                                       self.downlinked_objects_counter, problem.action_code(next_index, MEASURE, object_to_measure)))
 
         # -----------DOWNLINK operation-------------
         
         # Checking that the current satellite can downlink
-        if self.satellites[next_index].can_downlink():
-            downlink_child = State_t(self.satellites, self.objects, self, self.cost, self.downlinked_objects_counter,self.heuristic)
-            
-            # Creating new node
-            object_index = downlink_child.satellites[next_index].downlink()
-            
-            # Increase counter of downlinked objects
-            downlink_child.downlinked_objects_counter += 1
-
-            # Increase time
-            downlink_child.satellites[next_index].next_hour()
-
-            # Increase cost
-            downlink_child.increase_cost(self.satellites[next_index].downlink_cost)
-            
-            # Save action
-            downlink_child.action_taken = "SAT"+ str(next_index+1) + ": Downlink O" + str(object_index+1)
-
-            # Push object
-            children.append(downlink_child)
+        downlink_cost = problem.downlink_cost[next_index]
+        if battery >= downlink_cost and len(stack) > 0:
+            # Pop the last measured object, increase the counter of downlinked objects, time and cost
+            children.append(self.child(next_index, (battery - downlink_cost, bands, hour + 1, stack[:-1]), self.measured,
+                                       self.cost + downlink_cost, self.downlinked_objects_counter + 1,
+                                       problem.action_code(next_index, DOWNLINK, stack[-1])))
             
         # -------------TURN operation---------------
 
-        # Get number of turn operations that can be made
-        movements = self.satellites[next_index].can_move_bands(len(self.satellites))
-        
-        #  In case only one can be made, it is beacuse it is at the first visibility band or the last
-        if(movements == 1):
-            moving_child = State_t(self.satellites, self.objects, self, self.cost, self.downlinked_objects_counter,self.heuristic)
-
-            # If the element is at the beginning, we move it to the next visibility band
-            if self.satellites[next_index].bands == 0:
-                moving_child.satellites[next_index].turn(True)
-
-            # If it is at the end, to the previous visibility band
+        # A turn can be made only if there is battery enough
+        turn_cost = problem.turn_cost[next_index]
+        if battery >= turn_cost:
+            #  Only one turn can be made at the first visibility band or the last, otherwise two: one up and one down
+            if bands == 0:
+                new_bands = (1,)
+            elif bands == problem.num_satellites:
+                new_bands = (bands - 1,)
             else:
-                moving_child.satellites[next_index].turn(False)
-            
-            # Increase the time of the satellite
-            moving_child.satellites[next_index].next_hour()
-
-            # Increasing the cosst of the node with the operation move
-            moving_child.increase_cost(self.satellites[next_index].turn_cost)
-            
-            # Storing the action tanken by the satellite
-            moving_child.action_taken = "SAT" + str(next_index+1) + ": Turn"
-
-            # Appending the child
-            children.append(moving_child)
-        
-        # Case where the satellite can make two moves
-        elif (movements == 2):
-            # Creating one child to move down and another to move up
-            moving_child1 = State_t(self.satellites, self.objects, self, self.cost, self.downlinked_objects_counter,self.heuristic)
-            moving_child2 = State_t(self.satellites, self.objects, self, self.cost, self.downlinked_objects_counter,self.heuristic)
-
-            # In one child, one satellite moves up and the other down
-            moving_child1.satellites[next_index].turn(True)
-            moving_child2.satellites[next_index].turn(False)
-
-            # Increasing their time
-            moving_child1.satellites[next_index].next_hour()
-            moving_child2.satellites[next_index].next_hour()
-
-            # Incresing their cost
-            moving_child1.increase_cost(self.satellites[next_index].turn_cost)
-            moving_child2.increase_cost(self.satellites[next_index].turn_cost)
-            
-            # Storing their acction
-            moving_child1.action_taken = "SAT" + str(next_index+1) + ": Turn"
-            moving_child2.action_taken = "SAT" + str(next_index+1) + ": Turn"
-            
-            # Appending the childs
-            children.append(moving_child1)
-            children.append(moving_child2)
+                new_bands = (bands + 1, bands - 1)
+            for band in new_bands:
+                action = problem.action_code(next_index, TURN_UP if band > bands else TURN_DOWN)
+                children.append(self.child(next_index, (battery - turn_cost, band, hour + 1, stack), self.measured,
+                                           self.cost + turn_cost, self.downlinked_objects_counter, action))
         
         return children              
     
 
     def check_ability_measurement(self, next_index):
         """
-        Checks if a satellite can measure any object
+        Checks which objects a satellite can measure, looking up the objects it sees at its bands and hour
+        in the visibility index of the problem
 
         * Returns:
-        - -1 if it cannot measure
-        - the index of the object in the list if it can
+        - the bitmask of the unmeasured objects the satellite sees, 0 if it cannot measure any
         """
+        battery, bands, hour, stack = self.sats[next_index]
         # If the satellite has energy to measure
-        energy = self.satellites[next_index].battery >= self.satellites[next_index].measurement_cost
-
-        if not energy:
-            return -1
-
-        for object_index in range(len(self.objects)):
-            # If the object and satellite are in the same position
-            measurable = self.satellites[next_index].check_measurement_object(self.objects[object_index].band, self.objects[object_index].hour)
-            # If the current object has not been measured
-            not_measured = not(self.objects[object_index].measured)
-            
-            if measurable and not_measured:
-                return object_index
-        return -1
+        if battery < self.problem.measurement_cost[next_index]:
+            return 0
+        return self.problem.visible_objects(bands, hour) & ~self.measured
 
     def get_next_satellite_index(self):
         """
@@ -417,17 +709,26 @@ class State_t:
         """
         
         # Stores the index of the satellite most delayed
-        first_satellite_hour = self.satellites[0].hour
+        first_satellite_hour = self.sats[0][HOUR]
         
         # Searching for a more delayed one
-        for index_satellite in range(len(self.satellites)):
-            if(first_satellite_hour > self.satellites[index_satellite].hour):
+        for index_satellite in range(self.problem.num_satellites):
+            if(first_satellite_hour > self.sats[index_satellite][HOUR]):
                 return index_satellite
         return 0
 
  
         
         
+    def dominance_key(self):
+        """
+        Returns the part of the state without batteries and the batteries of the satellites. A state dominates
+        another one with the same part without batteries when it has at least as much battery in every satellite
+        and a cost lower or equal: every plan from the other one can be followed from it, as no heuristic nor
+        goal depends on the battery and more battery never forbids an action.
+        """
+        return self.problem.split_key(self.key)
+
     def __lt__(self, other):
         """ 
         Overriding less that method for the built in priority queue based on the cost and the heuristic function of a state
@@ -436,46 +737,22 @@ class State_t:
 
     def __hash__(self):
         """
-        Function that calculates a hash with the most relevant information of a state so that the
+        Function that returns the hash of the canonical key of the state so that the
         built in set container can compare different state.
         The members that uniquely identify a state are:
         - The measured state of the objects
-        - The Battery, hour mod 12 and the band of the satellite
-        - The number of objects that have been downlinked
+        - The Battery, hour mod 12, the band and the number of stacked measurements of each satellite, without
+          their order inside every group of interchangeable satellites
+        The number of objects that have been downlinked follows from them, as it is the number of measured
+        objects minus the ones still stacked.
         """
-        to_hash = ""
-        # Storing the state of each object
-        for object in self.objects:
-            to_hash += str(object.measured)
-
-        # Storing the state of each satellite
-        for satellite in self.satellites:
-            to_hash += str(satellite.battery) + str(satellite.bands) + str(satellite.hour%12)
-        
-        # Adding the downlinked object counter
-        to_hash+= str(self.downlinked_objects_counter)
-        return hash(to_hash)
+        return hash(self.key)
 
     def __eq__(self, other):
         """
-        Overrides the object equal member function in case the hash function fails in the hash fails in the set
+        Two states are equal when their canonical keys are equal
         """
-        # Storing the state of each object
-        if(self.downlinked_objects_counter != other.downlinked_objects_counter):
-            return False
-
-        # Storing the state of each satellite
-        for object_index in range(len(self.objects)):
-            if (self.objects[object_index].measured != other.objects[object_index].measured):
-                return False
-        
-        # Adding the downlinked object counter
-        for satellite_index in range(len(self.satellites)):
-            if(self.satellites[satellite_index].battery != other.satellites[satellite_index].battery
-            or self.satellites[satellite_index].bands != other.satellites[satellite_index].bands
-            or self.satellites[satellite_index].hour%12 != other.satellites[satellite_index].hour%12):
-                return False
-        return True
+        return self.key == other.key
     
 
     
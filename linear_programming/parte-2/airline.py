@@ -0,0 +1,268 @@
+"""
+Native solver of the model of parte-2.mod: the tickets sold in every plane (part 1) and the runway slot where
+every plane lands (part 2), maximizing the profit of the tickets minus the penalties of the delays.
+
+The data file is read into NumPy arrays and the constraints of the model are built at once as a sparse matrix,
+one block of rows per constraint of parte-2.mod and in the same order, with vectorized index arithmetic instead
+of loops over the planes and slots. The mixed integer program is solved with HiGHS through scipy.optimize.milp,
+so GLPK is not needed.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+from mathprog import read_dat
+
+# Status codes of scipy.optimize.milp
+STATUS = {0: "optimal", 1: "limit", 2: "infeasible", 3: "unbounded", 4: "error"}
+
+# Parts of parte-2.mod, each one with its own variables and constraints
+PARTS = ("tickets", "landings")
+
+
+class AirlineData:
+    """
+    Sets and parameters of parte-2.mod as NumPy arrays, indexed by the position of the members in their sets:
+    ticket_price, ticket_baggage (tickets), plane_seats, plane_capacity, arrival_time, price_penalty, max_time
+    (planes), slot_time (slots) and slot_available (runways x slots). consecutive lists the slot indices of every
+    group of CONSECUTIVE.
+    """
+    def __init__(self, sets, params):
+        self.planes = list(sets["PLANES"])
+        self.tickets = list(sets["TICKETS"])
+        self.runways = list(sets["RUNWAYS"])
+        self.slots = list(sets["SLOTS"])
+        self.groups = list(sets["GROUPS"])
+        slot_ids = {slot: index for index, slot in enumerate(self.slots)}
+        self.consecutive = [np.array([slot_ids[slot] for slot in sets["CONSECUTIVE"][group]], dtype=np.intp)
+                            for group in self.groups]
+
+        def vector(name, members):
+            return np.array([params[name][member] for member in members], dtype=float)
+
+        self.ticket_price = vector("TICKET_PRICE", self.tickets)
+        self.ticket_baggage = vector("TICKET_BAGGAGE", self.tickets)
+        self.plane_seats = vector("PLANE_SEATS", self.planes)
+        self.plane_capacity = vector("PLANE_CAPACITY", self.planes)
+        self.slot_time = vector("SLOT_TIME", self.slots)
+        self.arrival_time = vector("ARRIVAL_TIME", self.planes)
+        self.price_penalty = vector("PRICE_PENALTY", self.planes)
+        self.max_time = vector("MAX_TIME", self.planes)
+        self.slot_available = np.array([[params["SLOT_AVAILABLE"][runway, slot] for slot in self.slots]
+                                        for runway in self.runways], dtype=float)
+
+    @classmethod
+    def from_dat(cls, path):
+        return cls(*read_dat(path))
+
+    @property
+    def shape(self):
+        """
+        Numbers of planes, tickets, runways and slots
+        """
+        return len(self.planes), len(self.tickets), len(self.runways), len(self.slots)
+
+
+class LinearModel:
+    """
+    Mixed integer program min c x subject to row_lower <= matrix x <= row_upper, lower <= x <= upper, with the
+    variables marked in integrality restricted to integers. rows maps the name of every constraint of
+    parte-2.mod to the slice of its rows.
+
+    The model has the variables of its parts: quantity[p, t] at p*T + t for the tickets, followed by
+    assignment[r, p, s] at (r*P + p)*S + s from the offset landings for the landings. The sparsity pattern of
+    matrix only depends on the sizes of the sets, the coefficients that are 0 for the data are kept, so
+    update_model can change the data without building the matrix again: order[k] is the position of the k-th
+    entry of matrix.data in the order the blocks generate them.
+    """
+    def __init__(self, parts, c, matrix, order, row_lower, row_upper, lower, upper, integrality, rows, landings):
+        self.parts = parts
+        self.c = c
+        self.matrix = matrix
+        self.order = order
+        self.row_lower = row_lower
+        self.row_upper = row_upper
+        self.lower = lower
+        self.upper = upper
+        self.integrality = integrality
+        self.rows = rows
+        self.landings = landings
+
+
+def blocks(data, parts=PARTS):
+    """
+    Returns the constraints of the parts of parte-2.mod for data, as a list of (name, number of rows, row,
+    column, value, row lower bound, row upper bound) with one entry of row, column and value per coefficient,
+    the objective c and the offset of the landing variables
+    """
+    P, T, R, S = data.shape
+    if "tickets" in parts and not {"standard", "leisure", "business"} <= set(data.tickets):
+        raise ValueError("TICKETS must have the standard, leisure and business tickets used by parte-2.mod")
+    offset = P * T if "tickets" in parts else 0
+    quantity = np.arange(P * T).reshape(P, T)
+    assignment = offset + np.arange(R * P * S).reshape(R, P, S)
+    # Indices of the plane, runway and slot of every assignment variable
+    plane_of = np.broadcast_to(np.arange(P)[None, :, None], (R, P, S))
+    runway_of = np.broadcast_to(np.arange(R)[:, None, None], (R, P, S))
+    slot_of = np.broadcast_to(np.arange(S)[None, None, :], (R, P, S))
+    plane_of_quantity = np.repeat(np.arange(P), T)
+    result = []
+    costs = []
+
+    def add(name, size, row, column, value, lower, upper):
+        row, column, value = np.broadcast_arrays(np.ravel(row), np.ravel(column), np.ravel(value))
+        result.append((name, size, row, column, value, np.broadcast_to(lower, size), np.broadcast_to(upper, size)))
+
+    if "tickets" in parts:
+        add("airline_seats", 1, 0, quantity, 1.0, -np.inf, data.plane_seats.sum())
+        add("plane_capacity", P, plane_of_quantity, quantity, np.tile(data.ticket_baggage, P), -np.inf, data.plane_capacity)
+        add("leisure_tickets", P, np.arange(P), quantity[:, data.tickets.index("leisure")], 1.0, 20, np.inf)
+        add("business_tickets", P, np.arange(P), quantity[:, data.tickets.index("business")], 1.0, 10, np.inf)
+        standard = (np.arange(T) == data.tickets.index("standard")).astype(float)
+        add("tickets_proportion", 1, 0, quantity, np.tile(standard - 0.6, P), 0, np.inf)
+        add("plane_max_tickets", P, plane_of_quantity, quantity, 1.0, -np.inf, data.plane_seats)
+        # The objective maximizes the profit, milp minimizes
+        costs.append(-np.tile(data.ticket_price, P))
+
+    if "landings" in parts:
+        add("one_plane_per_slot", P, plane_of, assignment, 1.0, 1, 1)
+        add("one_slot_per_plane", R * S, runway_of * S + slot_of, assignment, 1.0, -np.inf, 1)
+        add("forbidden_slots", R * S, runway_of * S + slot_of, assignment, 1.0, -np.inf, data.slot_available.ravel())
+        delay = data.slot_time[None, :] - data.arrival_time[:, None]
+        add("after_starting_time", P * S, plane_of * S + slot_of, assignment, np.broadcast_to(-delay, (R, P, S)), -np.inf, 0)
+        margin = data.slot_time[None, :] - data.max_time[:, None]
+        add("before_max_time", P * S, plane_of * S + slot_of, assignment, np.broadcast_to(margin, (R, P, S)), -np.inf, 0)
+        G = len(data.groups)
+        members = np.concatenate(data.consecutive) if G else np.zeros(0, dtype=np.intp)
+        group_of = np.repeat(np.arange(G), [len(slots) for slots in data.consecutive])
+        # Every runway, member of a group and plane, as arrays of shape (R, members, P)
+        add("not_contiguous", R * G, np.broadcast_to((np.arange(R)[:, None] * G + group_of[None, :])[:, :, None], (R, len(members), P)),
+            assignment[:, :, members].transpose(0, 2, 1), 1.0, -np.inf, 1)
+        costs.append(np.broadcast_to(delay * data.price_penalty[:, None], (R, P, S)).ravel())
+    return result, np.concatenate(costs), offset
+
+
+def build_model(data, parts=PARTS):
+    """
+    Builds the LinearModel of the parts of parte-2.mod for data, both by default. The coefficients of every
+    constraint are generated as (row, column, value) arrays and joined into one sparse matrix.
+    """
+    P, T, R, S = data.shape
+    constraints, c, offset = blocks(data, parts)
+    rows = {}
+    row_arrays = []
+    count = 0
+    for name, size, row, *_ in constraints:
+        rows[name] = slice(count, count + size)
+        row_arrays.append(row + count)
+        count += size
+    row = np.concatenate(row_arrays)
+    column, value, row_lower, row_upper = (np.concatenate(arrays) for arrays in list(zip(*constraints))[3:])
+    # The positions of the entries are stored as the values of the matrix to find order
+    positions = sparse.csr_array((np.arange(1, len(value) + 1, dtype=float), (row, column)), shape=(count, len(c)))
+    order = positions.data.astype(np.intp) - 1
+    matrix = sparse.csr_array((value[order], positions.indices, positions.indptr), shape=(count, len(c)))
+
+    # quantity has no bounds in parte-2.mod, assignment is binary
+    lower = np.concatenate([np.full(offset, -np.inf), np.zeros(len(c) - offset)])
+    upper = np.concatenate([np.full(offset, np.inf), np.ones(len(c) - offset)])
+    return LinearModel(parts, c, matrix, order, row_lower, row_upper, lower, upper, np.ones(len(c)), rows, offset)
+
+
+def update_model(model, data):
+    """
+    Changes the coefficients, the bounds of the rows and the objective of model, built by build_model for data of
+    the same sizes, to the ones of data, keeping its sparse structure
+    """
+    constraints, model.c, _ = blocks(data, model.parts)
+    value, model.row_lower, model.row_upper = (np.concatenate(arrays) for arrays in list(zip(*constraints))[4:])
+    model.matrix.data[:] = value[model.order]
+
+
+class AirlineSolution:
+    """
+    Solution of the model.
+    - status: "optimal", "limit" when a limit stopped HiGHS (the solution is the best found, if any),
+      "infeasible", "unbounded" or "error"
+    - profit: value of the objective
+    - quantity: tickets of every plane, an array of planes x tickets
+    - assignment: 1 where a plane lands in a slot of a runway, an array of runways x planes x slots
+    - seconds: time of the solver
+    """
+    def __init__(self, status, profit, quantity, assignment, seconds):
+        self.status = status
+        self.profit = profit
+        self.quantity = quantity
+        self.assignment = assignment
+        self.seconds = seconds
+
+    def landings(self, data):
+        """
+        Returns the list of (plane, runway, slot) names of the assignment
+        """
+        if self.assignment is None:
+            return []
+        return [(data.planes[p], data.runways[r], data.slots[s]) for r, p, s in zip(*np.nonzero(self.assignment))]
+
+
+def solve(data, model=None, time_limit=None, gap=None):
+    """
+    Solves the model of data, built by build_model if it is not given, with HiGHS. time_limit is in seconds and
+    gap is the relative gap between the solution and the bound at which HiGHS stops, None for its defaults.
+    """
+    if model is None:
+        model = build_model(data)
+    options = {}
+    if time_limit is not None:
+        options["time_limit"] = time_limit
+    if gap is not None:
+        options["mip_rel_gap"] = gap
+    start = time.perf_counter()
+    result = milp(model.c, constraints=LinearConstraint(model.matrix, model.row_lower, model.row_upper),
+                  integrality=model.integrality, bounds=Bounds(model.lower, model.upper), options=options)
+    return solution(data, model, STATUS.get(result.status, "error"), result.x, time.perf_counter() - start)
+
+
+def solution(data, model, status, x, seconds):
+    """
+    Returns the AirlineSolution of the values x of the variables of model, None if there are none
+    """
+    if x is None:
+        return AirlineSolution(status, None, None, None, seconds)
+    P, T, R, S = data.shape
+    profit = -float(model.c @ x)
+    x = np.round(x).astype(int)
+    quantity = x[:model.landings].reshape(P, T) if "tickets" in model.parts else None
+    assignment = x[model.landings:].reshape(R, P, S) if "landings" in model.parts else None
+    return AirlineSolution(status, profit, quantity, assignment, seconds)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''Solves the tickets and runway slots model of parte-2.mod for a data file with HiGHS, without GLPK.
+        It prints the profit, the tickets of every plane and the slot where every plane lands.''',
+        epilog="""An example "python airline.py parte-2.dat" """
+    )
+    parser.add_argument('file', help='Data file in the MathProg format of parte-2.dat')
+    parser.add_argument('--time-limit', type=float, default=None, help='Seconds of the solver, after them the best solution found is printed')
+    parser.add_argument('--gap', type=float, default=None, help='Relative optimality gap at which the solver stops (default the one of HiGHS)')
+    args = parser.parse_args()
+
+    data = AirlineData.from_dat(args.file)
+    result = solve(data, time_limit=args.time_limit, gap=args.gap)
+    print("Status: {}".format(result.status))
+    if result.profit is None:
+        sys.exit(1)
+    print("Profit: {:g}".format(result.profit))
+    for plane, tickets in zip(data.planes, result.quantity):
+        print("{} sells {}".format(plane, ", ".join("{} {}".format(amount, ticket) for ticket, amount in zip(data.tickets, tickets))))
+    for plane, runway, slot in sorted(result.landings(data)):
+        print("{} lands in {} of {}".format(plane, slot, runway))
+    print("# solve time: {:.3f} s".format(result.seconds))
+    sys.exit(0)
@@ -0,0 +1,111 @@
+"""
+Reader of the data files (.dat) of GNU MathProg, the subset used by parte-2.dat:
+- set NAME := a b c;
+- set NAME[key] := a b;
+- param NAME := key value key value ...;
+- param NAME : column column ... := row value value ... row value value ...;
+- param NAME := value;
+The data; and end; statements that open and close a data file are accepted and ignored.
+Comments start with # until the end of the line or are enclosed in /* */.
+"""
+
+import re
+
+TOKEN = re.compile(r"/\*.*?\*/|#[^\n]*|:=|[;:\[\]]|'[^']*'|\"[^\"]*\"|[^\s;:\[\]]+", re.DOTALL)
+
+
+def tokens(text):
+    """
+    Generator of the tokens of a data file without the comments, quoted symbols lose their quotes
+    """
+    for match in TOKEN.finditer(text):
+        token = match.group()
+        if token.startswith("/*") or token.startswith("#"):
+            continue
+        if token[0] in "'\"":
+            token = token[1:-1]
+        yield token
+
+
+def number(token):
+    """
+    Returns the numeric value of a token, an int if it has no decimals
+    """
+    value = float(token)
+    return int(value) if value.is_integer() and "." not in token and "e" not in token.lower() else value
+
+
+def statements(text):
+    """
+    Generator of the statements of a data file as lists of tokens, without the final ;
+    """
+    statement = []
+    for token in tokens(text):
+        if token == ";":
+            if statement:
+                yield statement
+            statement = []
+        else:
+            statement.append(token)
+    if statement:
+        raise ValueError("The last statement does not end with ;: {}".format(" ".join(statement)))
+
+
+def read_dat(path):
+    """
+    Reads a data file.
+
+    *Returns:
+    - sets: dictionary from set names to their lists of members, or for indexed sets, to dictionaries from the
+      index to the lists of members
+    - params: dictionary from parameter names to their values, a number for scalar parameters or a dictionary
+      from the key (a member, or a (row, column) pair for tables) to the number
+    """
+    with open(path) as file:
+        text = file.read()
+    sets = {}
+    params = {}
+    for statement in statements(text):
+        if statement in (["data"], ["end"]):
+            continue
+        if len(statement) < 2:
+            raise ValueError("Invalid statement {}".format(" ".join(statement)))
+        kind, name, rest = statement[0], statement[1], statement[2:]
+        if kind == "set":
+            if rest[:1] == ["["]:
+                if len(rest) < 4 or rest[2] != "]" or rest[3] != ":=":
+                    raise ValueError("Invalid indexed set {}".format(" ".join(statement)))
+                key = rest[1]
+                sets.setdefault(name, {})[key] = rest[4:]
+            elif rest[:1] == [":="]:
+                sets[name] = rest[1:]
+            else:
+                raise ValueError("Invalid set {}".format(" ".join(statement)))
+        elif kind == "param":
+            if rest[:1] == [":"] and ":=" in rest:
+                # Table with the columns before := and one row per line
+                separator = rest.index(":=")
+                columns = rest[1:separator]
+                cells = rest[separator + 1:]
+                width = len(columns) + 1
+                if len(cells) % width:
+                    raise ValueError("The rows of {} do not have {} values".format(name, len(columns)))
+                table = {}
+                for start in range(0, len(cells), width):
+                    row = cells[start]
+                    for column, value in zip(columns, cells[start + 1:start + width]):
+                        table[row, column] = number(value)
+                params[name] = table
+            elif rest[:1] == [":="]:
+                values = rest[1:]
+                if len(values) == 1:
+                    params[name] = number(values[0])
+                elif len(values) % 2:
+                    raise ValueError("The parameter {} has a key without value".format(name))
+                else:
+                    params[name] = {key: number(value) for key, value in zip(values[::2], values[1::2])}
+            else:
+                raise ValueError("Invalid parameter {}".format(" ".join(statement)))
+        else:
+            raise ValueError("Unknown statement {}".format(kind))
+    return sets, params
@@ -0,0 +1,275 @@
+"""
+Scenario sweeps of parte-2.mod: a base data file is solved again for many changes of its parameters, such as
+the delay penalties (PRICE_PENALTY), the available slots (SLOT_AVAILABLE) or the arrival times (ARRIVAL_TIME).
+
+The tickets and the landings of the model do not share variables or constraints, so they are solved apart: the
+tickets only once for every different change of their parameters, and the landings for every scenario. The
+landings model is built once and only its coefficients, bounds and objective change between scenarios. With
+highspy, the model stays loaded in HiGHS, only the values that changed are passed to it and every scenario
+starts from the previous solution as incumbent. Without it, every scenario is solved from scratch by
+scipy.optimize.milp. Independent scenarios are split into contiguous chunks solved in a pool of processes.
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from airline import AirlineData, build_model, solution, solve, update_model
+from mathprog import read_dat
+
+# highspy keeps the model between scenarios, without it the scenarios are solved with scipy
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
+# Parameters of the tickets part of parte-2.mod, the others only change the landings
+TICKET_PARAMETERS = {"TICKET_PRICE", "TICKET_BAGGAGE", "PLANE_SEATS", "PLANE_CAPACITY"}
+
+# Order of the status from best to worst, the status of a scenario is the worst of its two parts
+SEVERITY = ["optimal", "limit", "infeasible", "unbounded", "error"]
+
+COLUMNS = ["scenario", "status", "profit", "penalty", "seconds", "plane", "runway", "slot"]
+
+
+def parse_key(key):
+    """
+    Key of a parameter: a member or, for tables, a (row, column) pair written as row,column
+    """
+    return tuple(key.split(",")) if "," in key else key
+
+
+def parse_vary(text):
+    """
+    Parses NAME[key]=value,value,... into (NAME, key, list of values)
+    """
+    try:
+        target, values = text.split("=", 1)
+        name, key = target.rstrip("]").split("[", 1)
+        return name, parse_key(key), [float(value) for value in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("{} is not of the form NAME[key]=value,value,...".format(text))
+
+
+def grid(varied):
+    """
+    Returns the scenarios of every combination of the values of varied, a list of (name, key, values), as
+    dictionaries from (name, key) to the value
+    """
+    targets = [(name, key) for name, key, _ in varied]
+    return [dict(zip(targets, values)) for values in itertools.product(*(values for _, _, values in varied))]
+
+
+def read_scenarios(path):
+    """
+    Reads scenarios from a file of JSON lines like {"PRICE_PENALTY": {"plane0": 150}, "SLOT_AVAILABLE":
+    {"runway0,slot1": 0}}
+    """
+    scenarios = []
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                scenarios.append({(name, parse_key(key)): value
+                                  for name, changes in json.loads(line).items() for key, value in changes.items()})
+    return scenarios
+
+
+def label(target):
+    name, key = target
+    return "{}[{}]".format(name, ",".join(key) if isinstance(key, tuple) else key)
+
+
+def apply(params, scenario):
+    """
+    Returns a copy of params with the changes of a scenario, only the changed parameters are copied
+    """
+    changed = dict(params)
+    for (name, key), value in scenario.items():
+        if name not in params or key not in params[name]:
+            raise KeyError("{} is not in the data".format(label((name, key))))
+        if changed[name] is params[name]:
+            changed[name] = dict(params[name])
+        changed[name][key] = value
+    return changed
+
+
+class ScenarioSolver:
+    """
+    Solves the scenarios of one base data file one after the other, reusing the landings model and, with highspy,
+    the previous solution of the landings as the incumbent of the next one
+    """
+    def __init__(self, sets, params, time_limit=None, gap=None):
+        self.sets = sets
+        self.params = params
+        self.time_limit = time_limit
+        self.gap = gap
+        self.model = build_model(AirlineData(sets, params), ("landings",))
+        self.tickets = {}
+        self.highs = None
+        # Objective, row bounds and coefficients loaded in HiGHS
+        self.loaded = None
+        self.previous = None
+
+    def _load(self):
+        """
+        Passes the landings model to a new HiGHS instance
+        """
+        model = self.model
+        self.highs = highspy.Highs()
+        self.highs.setOptionValue("output_flag", False)
+        if self.time_limit is not None:
+            self.highs.setOptionValue("time_limit", float(self.time_limit))
+        if self.gap is not None:
+            self.highs.setOptionValue("mip_rel_gap", float(self.gap))
+        lp = highspy.HighsLp()
+        lp.num_col_, lp.num_row_ = model.matrix.shape[1], model.matrix.shape[0]
+        lp.col_cost_, lp.col_lower_, lp.col_upper_ = model.c, model.lower, model.upper
+        lp.row_lower_, lp.row_upper_ = model.row_lower, model.row_upper
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.start_ = model.matrix.indptr
+        lp.a_matrix_.index_ = model.matrix.indices
+        lp.a_matrix_.value_ = model.matrix.data
+        lp.integrality_ = [highspy.HighsVarType.kInteger] * lp.num_col_
+        self.highs.passModel(lp)
+        self.rows_of_entries = np.repeat(np.arange(lp.num_row_), np.diff(model.matrix.indptr))
+
+    def _change(self):
+        """
+        Passes to HiGHS only the costs, row bounds and coefficients that changed since the last scenario
+        """
+        model = self.model
+        c, row_lower, row_upper, values = self.loaded
+        changed = np.flatnonzero(model.c != c)
+        if len(changed):
+            self.highs.changeColsCost(len(changed), changed.astype(np.int32), model.c[changed])
+        changed = np.flatnonzero((model.row_lower != row_lower) | (model.row_upper != row_upper))
+        if len(changed):
+            self.highs.changeRowsBounds(len(changed), changed.astype(np.int32), model.row_lower[changed], model.row_upper[changed])
+        for entry in np.flatnonzero(model.matrix.data != values):
+            self.highs.changeCoeff(int(self.rows_of_entries[entry]), int(model.matrix.indices[entry]), float(model.matrix.data[entry]))
+
+    def _landings(self, data):
+        """
+        Solves the landings of data, starting from the previous solution
+        """
+        update_model(self.model, data)
+        if highspy is None:
+            return solve(data, self.model, self.time_limit, self.gap)
+        start = time.perf_counter()
+        if self.highs is None:
+            self._load()
+        else:
+            self._change()
+        self.loaded = (self.model.c.copy(), self.model.row_lower.copy(), self.model.row_upper.copy(), self.model.matrix.data.copy())
+        if self.previous is not None:
+            incumbent = highspy.HighsSolution()
+            incumbent.col_value = self.previous
+            self.highs.setSolution(incumbent)
+        self.highs.run()
+        status = self.highs.getModelStatus()
+        status = {highspy.HighsModelStatus.kOptimal: "optimal", highspy.HighsModelStatus.kInfeasible: "infeasible",
+                  highspy.HighsModelStatus.kUnbounded: "unbounded", highspy.HighsModelStatus.kTimeLimit: "limit"}.get(status, "error")
+        x = None
+        if self.highs.getInfo().primal_solution_status == 2:
+            x = np.array(self.highs.getSolution().col_value)
+            self.previous = list(x)
+        return solution(data, self.model, status, x, time.perf_counter() - start)
+
+    def solve(self, scenario):
+        """
+        Solves a scenario and returns its rows of the results table, one per plane
+        """
+        data = AirlineData(self.sets, apply(self.params, scenario))
+        seconds = 0
+        key = tuple(sorted((label(target), value) for target, value in scenario.items() if target[0] in TICKET_PARAMETERS))
+        if key not in self.tickets:
+            self.tickets[key] = solve(data, build_model(data, ("tickets",)), self.time_limit, self.gap)
+            seconds += self.tickets[key].seconds
+        tickets = self.tickets[key]
+        landings = self._landings(data)
+        seconds += landings.seconds
+
+        row = {label(target): value for target, value in scenario.items()}
+        row["status"] = max(tickets.status, landings.status, key=SEVERITY.index)
+        if tickets.profit is not None and landings.profit is not None:
+            row["profit"] = tickets.profit + landings.profit
+        if landings.profit is not None:
+            row["penalty"] = -landings.profit
+        row["seconds"] = round(seconds, 4)
+        planes = sorted(landings.landings(data))
+        if not planes:
+            return [row]
+        return [dict(row, plane=plane, runway=runway, slot=slot) for plane, runway, slot in planes]
+
+
+# Solver of the scenarios of a worker, set by the pool initializer
+_solver = None
+
+
+def _initialize(sets, params, time_limit, gap):
+    global _solver
+    _solver = ScenarioSolver(sets, params, time_limit, gap)
+
+
+def _solve_chunk(chunk):
+    return [row for number, scenario in chunk for row in
+            (dict(scenario_row, scenario=number) for scenario_row in _solver.solve(scenario))]
+
+
+def sweep(sets, params, scenarios, workers=1, time_limit=None, gap=None):
+    """
+    Solves every scenario and returns the rows of the results table. The scenarios are split into one chunk of
+    consecutive scenarios per worker, so each one warm starts from a similar scenario.
+    """
+    numbered = list(enumerate(scenarios))
+    workers = min(workers or os.cpu_count() or 1, len(numbered)) or 1
+    size = -(-len(numbered) // workers)
+    chunks = [numbered[start:start + size] for start in range(0, len(numbered), size)]
+    if workers == 1:
+        _initialize(sets, params, time_limit, gap)
+        return [row for chunk in chunks for row in _solve_chunk(chunk)]
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=_initialize, initargs=(sets, params, time_limit, gap)) as executor:
+        return [row for rows in executor.map(_solve_chunk, chunks) for row in rows]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''Solves parte-2.mod for many scenarios that change the parameters of a base data file and writes
+        a CSV table with one row per scenario and plane: the status, the profit, the penalty of the delays, the solve
+        time and the slot where the plane lands.''',
+        epilog="""An example "python sweep.py parte-2.dat --vary PRICE_PENALTY[plane0]=100,200,300 --vary SLOT_AVAILABLE[runway0,slot4]=0,1" """
+    )
+    parser.add_argument('file', help='Base data file in the MathProg format of parte-2.dat')
+    parser.add_argument('--vary', type=parse_vary, action='append', default=[],
+                        help='Values of a parameter as NAME[key]=value,value,...; the scenarios are every combination of them')
+    parser.add_argument('--scenarios', help='File with one scenario per line as JSON, {"NAME": {"key": value}}')
+    parser.add_argument('--workers', type=int, default=1, help='Processes that solve the scenarios (0 for the number of cores)')
+    parser.add_argument('--time-limit', type=float, default=None, help='Seconds of the solver for every scenario')
+    parser.add_argument('--gap', type=float, default=None, help='Relative optimality gap at which the solver stops')
+    parser.add_argument('--output', default=None, help='CSV file of the results (default the standard output)')
+    args = parser.parse_args()
+
+    sets, params = read_dat(args.file)
+    scenarios = grid(args.vary) if args.vary else []
+    if args.scenarios:
+        scenarios += read_scenarios(args.scenarios)
+    if not scenarios:
+        scenarios = [{}]
+    rows = sweep(sets, params, scenarios, args.workers, args.time_limit, args.gap)
+
+    varied = sorted({key for row in rows for key in row} - set(COLUMNS))
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    writer = csv.DictWriter(output, COLUMNS[:1] + varied + COLUMNS[1:])
+    writer.writeheader()
+    writer.writerows(rows)
+    if args.output:
+        output.close()
+    sys.exit(0)